@@ -1,28 +1,39 @@
-from fastapi import APIRouter, HTTPException
-from pathlib import Path
-import json
-from typing import Dict, Any
+import os
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from app.services.http_cache import CachedBody, cached_response, make_cached_body
+from v1.src.catalog import course_code, get_catalog
+from v1.src.search.popularity import popularity
 
 router = APIRouter()
 
-ROOT_DIR = Path(__file__).resolve().parents[5]
-DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
+COURSE_CACHE_MAX_AGE = int(os.getenv("COURSE_CACHE_MAX_AGE", "3600"))
+
+# (catalog version, course code -> serialized body); a course's body only
+# changes with courses.json, so it is built once per catalog version
+_bodies: Tuple[Optional[str], Dict[str, CachedBody]] = (None, {})
+
 
-try:
-    with open(DOCUMENTS_DIR / "courses.json", "r", encoding="utf-8") as f:
-        _COURSES = json.load(f)
-        COURSES_BY_CODE: Dict[str, Dict[str, Any]] = {c["course_code"]: c for c in _COURSES}
-        COURSES_BY_TITLE: Dict[str, Dict[str, Any]] = {c["title"]: c for c in _COURSES}
-except Exception as e:
-    print("[course] Failed to load courses.json:", e)
-    COURSES_BY_CODE = {}
-    COURSES_BY_TITLE = {}
+def course_body(course: dict, version: str) -> CachedBody:
+    global _bodies
+    cached_version, bodies = _bodies
+    if cached_version != version:
+        bodies = {}
+        _bodies = (version, bodies)
+    code = course_code(course)
+    body = bodies.get(code)
+    if body is None:
+        body = bodies[code] = make_cached_body(course)
+    return body
 
 
 @router.get("/course/{course_id}")
-def get_course_details(course_id: str):
+def get_course_details(course_id: str, request: Request):
     """Return full course details for a given course code OR title."""
-    course = COURSES_BY_CODE.get(course_id) or COURSES_BY_TITLE.get(course_id)
+    catalog = get_catalog()
+    course = catalog.get(course_id)
     if not course:
         raise HTTPException(status_code=404, detail=f"Course {course_id} not found")
-    return course 
\ No newline at end of file
+    popularity.record("course", course_code(course))
+    return cached_response(request, course_body(course, catalog.version), COURSE_CACHE_MAX_AGE)
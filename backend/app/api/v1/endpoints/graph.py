@@ -1,77 +1,266 @@
 # app/api/v1/endpoints/graph.py
 
-from fastapi import APIRouter, HTTPException
-from pathlib import Path
-import json
-from typing import Set, Optional
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from app.services.cpu_executor import cpu_executor
+from v1.src.catalog import normalize_code
+from v1.src.prereq.closure import get_closure
+from v1.src.prereq.eligibility import get_rules
+from v1.src.prereq.planner import parse_term, plan_courses
+from v1.src.prereq.graph import get_prereq_graph
 router = APIRouter()
 
-ROOT_DIR = Path(__file__).resolve().parents[5]
-GRAPH_PATH = ROOT_DIR / "v1" / "files" / "prereq_graph.json"
 
-# Load once at startup so you’re not hitting disk on every call
-with open(GRAPH_PATH, "r") as f:
-    full_graph = json.load(f)
+def build_advanced_subgraph(course_id: str):
+    # all prerequisites (transitively), the links among them and the course's
+    # own outgoing links; O(size of the subgraph), see prereq/graph.py
+    return get_prereq_graph().ancestor_subgraph(course_id)
 
 
-# Build a quick reverse-adjacency dict: course → list of its direct prereqs
-rev_adj: dict[str, list[str]] = {}
-for link in full_graph["links"]:
-    rev_adj.setdefault(link["target"], []).append(link["source"])
+def build_direct_subgraph(course_id: str):
+    return get_prereq_graph().direct_subgraph(course_id)
 
 
 @router.get("/prereq-graph-advanced/{course_id}")
-def get_subgraph(course_id: str):
-    def find_ancestors(course_id: str, visited: Optional[Set[str]] = None) -> Set[str]:
-        if visited is None:
-            visited = set()
-        for parent in rev_adj.get(course_id, []):
-            if parent not in visited:
-                visited.add(parent)
-                find_ancestors(parent, visited)
-        return visited
-    #N = number of courses = number of nodes = len(full_graph["nodes"])
-    #L = number of prereq relationships = number of links = len(full_graph["links"])
-
-    # Find all ancestors leading up to this course in O(N + L)
-    ancestor_ids = find_ancestors(course_id)
-
-    # Full list of links for filtering
-    all_links = full_graph["links"]
-
-    # Collect only the links among ancestors (plus those pointing to course_id)
-    related_links = [
-        l for l in all_links
-        if (l["source"] in ancestor_ids and l["target"] in ancestor_ids)
-        or (l["source"] in ancestor_ids and l["target"] == course_id)
-    ]
-
-    # Immediate forward links out of this course
-    forward_links = [
-        l for l in all_links
-        if l["source"] == course_id
-    ]
-
-    combined_links = related_links + forward_links
-
-    # Build the set of node IDs we need
-    node_ids = {
-        course_id,
-        *[l["source"] for l in combined_links],
-        *[l["target"]   for l in combined_links]
+async def get_subgraph_advanced(course_id: str):
+    return await cpu_executor.run(build_advanced_subgraph, course_id)
+
+
+@router.get("/prereq-graph/{course_id}")
+async def get_subgraph(course_id: str):
+    return await cpu_executor.run(build_direct_subgraph, course_id)
+
+
+class UnionGraphRequest(BaseModel):
+    courses: List[str] = Field(default_factory=list, max_length=5000)
+    # every course whose code starts with this prefix, e.g. "CSC" or "CSC3"
+    department: Optional[str] = None
+    format: Literal["full", "compact"] = "full"
+
+
+def build_union_subgraph(course_ids: List[str], department: Optional[str] = None, format: str = "full"):
+    """
+    Union of the /prereq-graph-advanced subgraphs of all `course_ids` (and
+    of every course under `department`).  "compact" sends the node ids once
+    and the links as two index arrays into them.
+    """
+    graph = get_prereq_graph()
+    seeds, unknown = [], []
+    for course_id in course_ids:
+        u = graph.node_id(normalize_code(course_id))
+        if u is None:
+            unknown.append(course_id)
+        else:
+            seeds.append(u)
+    if department:
+        prefix = normalize_code(department)
+        seeds += [u for u, code in enumerate(graph.ids) if code.startswith(prefix)]
+    node_ids, edge_ids = graph.union_subgraph(seeds)
+    if format == "compact":
+        payload = graph.compact_payload(node_ids, edge_ids)
+    else:
+        payload = graph.payload(node_ids, edge_ids)
+    payload["unknown"] = unknown
+    return payload
+
+
+@router.get("/prereq-graph-union")
+async def get_union_subgraph(
+    courses: Optional[str] = Query(None, description='comma-separated, e.g. "CSC369H5,CSC458H5"'),
+    department: Optional[str] = Query(None, description='code prefix, e.g. "CSC"'),
+    format: Literal["full", "compact"] = Query("full"),
+):
+    course_ids = [c for c in (courses or "").split(",") if c.strip()]
+    if not course_ids and not department:
+        raise HTTPException(status_code=400, detail="Give courses and/or department")
+    return await cpu_executor.run(build_union_subgraph, course_ids, department, format)
+
+
+@router.post("/prereq-graph-union")
+async def post_union_subgraph(request: UnionGraphRequest):
+    """Same as GET, for course lists too long for a URL."""
+    if not request.courses and not request.department:
+        raise HTTPException(status_code=400, detail="Give courses and/or department")
+    return await cpu_executor.run(build_union_subgraph, request.courses, request.department, request.format)
+
+
+# ---------- transitive closure (prereq/closure.py) ----------
+# answered from precomputed bitsets: each call is a few array lookups
+
+def node_id(course_id: str) -> int:
+    u = get_prereq_graph().node_id(normalize_code(course_id))
+    if u is None:
+        raise HTTPException(status_code=404, detail=f"Course {course_id} not in the prerequisite graph")
+    return u
+
+
+def course_ids(node_ids) -> List[str]:
+    ids = get_prereq_graph().ids
+    return [ids[i] for i in node_ids]
+
+
+@router.get("/prereq/ancestors/{course_id}")
+def get_ancestors(course_id: str):
+    """Every course needed (transitively) before `course_id`."""
+    u = node_id(course_id)
+    return {"course": get_prereq_graph().ids[u], "ancestors": course_ids(get_closure().ancestors_of(u))}
+
+
+@router.get("/prereq/descendants/{course_id}")
+def get_descendants(course_id: str):
+    """Every course that `course_id` (transitively) unlocks."""
+    u = node_id(course_id)
+    return {"course": get_prereq_graph().ids[u], "descendants": course_ids(get_closure().descendants_of(u))}
+
+
+@router.get("/prereq/is-prereq")
+def get_is_prereq(
+    prereq: str = Query(..., description="e.g. CSC108H5"),
+    course: str = Query(..., description="e.g. CSC369H5"),
+):
+    """Is `prereq` a direct or transitive prerequisite of `course`?"""
+    x, y = node_id(prereq), node_id(course)
+    ids = get_prereq_graph().ids
+    return {"prereq": ids[x], "course": ids[y], "is_prereq": get_closure().is_prereq(x, y)}
+
+
+class ClosureBatchRequest(BaseModel):
+    courses: List[str] = Field(default_factory=list, max_length=5000)
+    # (prereq, course) pairs to test
+    pairs: List[Tuple[str, str]] = Field(default_factory=list, max_length=100000)
+    direction: Literal["ancestors", "descendants", "both"] = "both"
+    # also return the union over all `courses` (e.g. everything a program needs)
+    union: bool = False
+
+
+def closure_batch_payload(request: ClosureBatchRequest) -> Dict[str, Any]:
+    graph, closure = get_prereq_graph(), get_closure()
+    unknown: List[str] = []
+
+    def lookup(course_id: str) -> int:
+        u = graph.node_id(normalize_code(course_id))
+        if u is None:
+            unknown.append(course_id)
+            return -1
+        return u
+
+    us = [lookup(c) for c in request.courses]
+    known = [u for u in us if u >= 0]
+    directions = ["ancestors", "descendants"] if request.direction == "both" else [request.direction]
+    results = [{"course": graph.ids[u]} for u in known]
+    for direction in directions:
+        rows = closure.rows(known, direction)
+        for result, row in zip(results, rows):
+            result[direction] = course_ids(row.nonzero()[0])
+    payload: Dict[str, Any] = {"results": results}
+
+    if request.union:
+        payload["union"] = {d: course_ids(closure.union(known, d)) for d in directions}
+
+    if request.pairs:
+        xs = [lookup(x) for x, _ in request.pairs]
+        ys = [lookup(y) for _, y in request.pairs]
+        valid = [i for i, (x, y) in enumerate(zip(xs, ys)) if x >= 0 and y >= 0]
+        answers = closure.is_prereq_many([xs[i] for i in valid], [ys[i] for i in valid]).tolist()
+        is_prereq: List[Any] = [None] * len(request.pairs)      # None: unknown course
+        for i, answer in zip(valid, answers):
+            is_prereq[i] = answer
+        payload["pairs"] = [
+            {"prereq": x, "course": y, "is_prereq": answer}
+            for (x, y), answer in zip(request.pairs, is_prereq)
+        ]
+
+    payload["unknown"] = list(dict.fromkeys(unknown))
+    return payload
+
+
+@router.post("/prereq/closure/batch")
+async def get_closure_batch(request: ClosureBatchRequest):
+    """
+    Ancestors and/or descendants of many courses, their union and
+    is-prerequisite answers for many pairs, in one call.
+    """
+    return await cpu_executor.run(closure_batch_payload, request)
+
+
+# ---------- eligibility (prereq/eligibility.py) ----------
+
+class EligibilityRequest(BaseModel):
+    completed: List[str] = Field(default_factory=list, max_length=5000)
+
+
+@router.post("/prereq/eligible")
+def get_eligible(request: EligibilityRequest):
+    """
+    Every course whose course-code prerequisites the completed courses
+    satisfy (credit counts, grades and permissions are not checked).
+    `unlocked` is the subset that has any prerequisite at all.
+    """
+    rules = get_rules()
+    completed, unknown = rules.completed_mask(request.completed)
+    rows = np.flatnonzero(rules.eligible(completed))
+    return {
+        "eligible": [rules.courses[r] for r in rows],
+        "unlocked": [rules.courses[r] for r in rows if rules.n_clauses[r]],
+        "unknown": unknown,
     }
 
-    # Filter nodes down to just those in our subgraph
-    nodes = [n for n in full_graph["nodes"] if n["id"] in node_ids]
 
-    return {"nodes": nodes, "links": combined_links}
+# ---------- planning (prereq/planner.py) ----------
 
+class PlanRequest(BaseModel):
+    targets: List[str] = Field(..., min_length=1, max_length=50)
+    completed: List[str] = Field(default_factory=list, max_length=200)
+    max_load: int = Field(5, ge=1, le=10)       # half courses per term; a Y course counts 2
+    start_term: str = "Fall 2026"
+    include_summer: bool = False
+    deadline: Optional[str] = None              # e.g. "Fall 2027"
 
-@router.get("/prereq-graph/{course_id}")
-def get_subgraph(course_id: str):
-    links = [l for l in full_graph["links"] if l["source"] == course_id or l["target"] == course_id]
-    node_ids = {course_id, *[l["source"] for l in links], *[l["target"] for l in links]}
-    nodes    = [n for n in full_graph["nodes"] if n["id"] in node_ids]
-    # print(node_ids)
-    # print(links)
-    return {"nodes": nodes, "links": links}
+
+class PlanBatchRequest(BaseModel):
+    students: List[PlanRequest] = Field(..., min_length=1, max_length=2000)
+
+
+def check_terms(request: PlanRequest) -> None:
+    try:
+        parse_term(request.start_term)
+        if request.deadline:
+            parse_term(request.deadline)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def plan_payload(request: PlanRequest) -> Dict[str, Any]:
+    return plan_courses(
+        request.targets, request.completed, request.max_load,
+        request.start_term, request.include_summer, request.deadline,
+    )
+
+
+@router.post("/prereq/plan")
+async def get_plan(request: PlanRequest):
+    """
+    Term-by-term schedule reaching `targets` from `completed` that respects
+    course-code prerequisites and the per-term load limit.
+    """
+    check_terms(request)
+    return await cpu_executor.run(plan_payload, request)
+
+
+@router.post("/prereq/plan/batch")
+async def get_plan_batch(request: PlanBatchRequest):
+    """One plan per student; identical student profiles are planned once."""
+    for student in request.students:
+        check_terms(student)
+
+    def plan_all():
+        keys = [student.model_dump_json() for student in request.students]
+        plans: Dict[str, Dict[str, Any]] = {}
+        for key, student in zip(keys, request.students):
+            if key not in plans:
+                plans[key] = plan_payload(student)
+        return {"plans": [plans[key] for key in keys]}
+
+    return await cpu_executor.run(plan_all)
@@ -1,10 +1,25 @@
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import List
+import threading
 from v1.src.Recommendation.recSys import CourseRecommender
+from app.services.cpu_executor import cpu_executor
 
 router = APIRouter()
 
+_recommender = None
+_recommender_lock = threading.Lock()
+
+
+def get_recommender() -> CourseRecommender:
+    """Build the embedding matrices once instead of on every request."""
+    global _recommender
+    if _recommender is None:
+        with _recommender_lock:
+            if _recommender is None:
+                _recommender = CourseRecommender()
+    return _recommender
+
 class RecommendationRequest(BaseModel):
     course_id: str
     top_k: int = 9
@@ -14,13 +29,18 @@ class CourseRecommendation(BaseModel):
     similarity: float
 
 @router.post("/recommend", response_model=List[CourseRecommendation])
-def get_recommendations(request: RecommendationRequest):
-    recommender = CourseRecommender()
+async def get_recommendations(request: RecommendationRequest):
     """Get top-k recommended courses for a given course ID."""
-    recommendations = recommender.get_similar_courses(
-        course_id=request.course_id,
-        top_k=request.top_k
-    )
+    def recommend():
+        return get_recommender().get_similar_courses(
+            course_id=request.course_id,
+            top_k=request.top_k
+        )
+
+    try:
+        recommendations = await cpu_executor.run(recommend)
+    except ValueError:
+        recommendations = []                 # course_id has no embedding
 
     if not recommendations:
         raise HTTPException(status_code=404, detail="Course ID not found or no recommendations available.")
@@ -1,12 +1,29 @@
 # search.py
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
+from pydantic import BaseModel, Field
 from pathlib import Path
 import json
-from typing import List, Dict, Any, Tuple
+import os
+from typing import List, Dict, Any, Tuple, Optional
 import sys
 
 
-from v1.src.search.hybrid_search import hybrid_search
+from app.services.cpu_executor import cpu_executor
+from v1.src.catalog import course_code, get_catalog, normalize_code
+from v1.src.search.cache import LRUCache
+from v1.src.search.facets import FacetError, Filters, matches, normalize_filters
+from v1.src.search.fuzzy import CODE_LIKE_RE, WORD_RE, get_fuzzy_index
+from v1.src.search.popularity import popularity
+from v1.src.search.hybrid_search import (
+    hybrid_search,
+    hybrid_search_many,
+    embedding_cache,
+    encode_batcher,
+    index_version,
+    live_index,
+    normalize_query,
+    popularity_epoch,
+)
 
 router = APIRouter()
 
@@ -18,71 +35,224 @@ import re
 
 COURSE_CODE_RE = re.compile(r"^[A-Z]{3}\s*\d{3}[A-Z]?\d?[HFYS]?$", re.I)
 
-def exact_course_lookup(query: str) -> list[dict[str, Any]]:
+def exact_course_lookup(query: str, facets: Filters = ()) -> list[dict[str, Any]]:
     """
-    If `query` is a course code, scan courses.json and return the first match
-    where the code is found *anywhere* in the `title` field.
-    Returns [] when no match or when query doesn’t look like a code.
+    If `query` is a course code, return the first course whose code starts
+    with it (so "CSC108" finds CSC108H5), via the catalog's hash index.
+    A code-like query with no such course ("CSC20H5", "MATH135") returns
+    the courses one typo away instead.
+    Returns [] when no match, when query doesn’t look like a code or when
+    the course is outside the `facets` filters.
     """
-    if not COURSE_CODE_RE.match(query.strip()):
-        return []
+    query = query.strip()
+    index = live_index.snapshot()
+    courses: List[Dict[str, Any]] = []
+    if COURSE_CODE_RE.match(query):
+        prefix = normalize_code(query)
+        # courses added/updated through /search/index, then the catalog;
+        # an exact code beats a longer one, tombstoned courses are skipped
+        candidates = [payload for code, payload in sorted(index.payloads.items()) if code.startswith(prefix)]
+        candidates += get_catalog().all_by_code_prefix(prefix)
+        candidates.sort(key=lambda course: normalize_code(course_code(course)) != prefix)
+        course = next((c for c in candidates if not index.is_deleted(course_code(c))), None)
+        if course:
+            courses = [course]          # wrap in list so endpoint shape stays the same
+    if not courses and CODE_LIKE_RE.match(query):
+        catalog = get_catalog()
+        courses = [
+            index.payload(code) or catalog.by_code(code)
+            for code in get_fuzzy_index(index).match_codes(query)
+        ]
+        courses = [course for course in courses if course]
 
-    with open(DOCUMENTS_DIR / "courses.json", encoding="utf-8") as f:
-        courses = json.load(f)
+    return [
+        course for course in courses
+        if not index.is_deleted(course_code(course))
+        if not facets or matches(course_code(course), facets)
+    ]
 
-    q_norm = query.upper().replace(" ", "")
-    for course in courses:
-        title_norm = course["title"].upper().replace(" ", "")
-        if q_norm in title_norm:
-            return [course]          # wrap in list so endpoint shape stays the same
-    return []
+
+def spell_corrected(query: str) -> str:
+    """
+    `query` with clearly misspelled words fixed ("calclus" -> "calculus"),
+    else unchanged.  Only fed to the sparse channels; the encoder copes
+    with typos on its own and sees the query as typed.
+    """
+    corrected = get_fuzzy_index(live_index.snapshot()).correct_text(query)
+    return query if corrected == " ".join(WORD_RE.findall(query.lower())) else corrected
 
 
-def get_course_info_by_id(hits: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
+def get_course_info_by_id(hits: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
     """
     Convert (id, score) pairs returned by hybrid_search into
     the structured payload your client expects.
     """
-    # Load once per request; cache at module level if perf is a concern
-    with open(DOCUMENTS_DIR / "courses.json", encoding="utf-8") as f:
-        courses = {c["title"]: c for c in json.load(f)}
-
+    catalog = get_catalog()
+    index = live_index.snapshot()
     results = []
     for cid, score in hits:
-        course = courses.get(cid)
-        if course is None:
-            continue                 # id in items.json but not in courses.json
-        # Adjust / trim fields as you like
-        results.append(
-            {
-                "course_code": course["course_code"],
-                "title":        course["title"],
-                "description":  course["description"],
-                "prerequisites": course.get("prerequisites"),
-                "score":        round(score, 4),
-            }
-        )
+        payload = index.payload(cid) or catalog.search_payload(cid)
+        if payload is None:
+            continue                 # id in the index but not in courses.json
+        results.append({**payload, "score": round(score, 4)})
     return results
 
+
+# ---------- response cache ----------
+# Serialized /search bodies keyed by (data version, normalized query, facet filters).
+# The version covers the search index, the course catalog and the
+# popularity prior (popularity_epoch, refreshed every few minutes while
+# courses get views), so a change to any of them makes every old entry
+# unreachable; they are dropped on the next request.
+response_cache = LRUCache(
+    max_size=int(os.getenv("SEARCH_RESPONSE_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("SEARCH_RESPONSE_CACHE_TTL", "3600")),
+)
+_response_cache_version: Optional[str] = None
+
+
+def search_data_version() -> str:
+    return f"{index_version()}:{get_catalog().version}:{popularity_epoch()}"
+
+
+def _response_cache_key(query: str, params: Tuple) -> Tuple:
+    global _response_cache_version
+    version = search_data_version()
+    if version != _response_cache_version:
+        response_cache.clear()
+        _response_cache_version = version
+    return (version, normalize_query(query), params)
+
+
+def peek_search_body(query: str, facets: Filters = ()) -> Optional[bytes]:
+    """The cached JSON body for `query`, or None; cheap enough for the event loop."""
+    return response_cache.get(_response_cache_key(query, facets))
+
+
+def search_results(query: str, facets: Filters = (), top_n: int = 10) -> List[Dict[str, Any]]:
+    """
+    The /search pipeline: exact (or typo-tolerant) code lookup, else the
+    hybrid ranking with spell correction on the sparse channels.
+    """
+    exact_hit = exact_course_lookup(query, facets)
+    if exact_hit:
+        return exact_hit
+    hits = hybrid_search(query, top_n=top_n, facets=facets, sparse_query=spell_corrected(query))
+    return get_course_info_by_id(hits)
+
+
+def compute_search_body(query: str, facets: Filters = ()) -> bytes:
+    """Run the search pipeline for `query` and cache the serialized body."""
+    key = _response_cache_key(query, facets)
+    payload = {"results": search_results(query, facets)}
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    response_cache.put(key, body)
+    return body
+
+
+def cached_search_body(query: str, facets: Filters = ()) -> bytes:
+    """Return the JSON body for `query`, computing and caching it on a miss."""
+    body = peek_search_body(query, facets)
+    return body if body is not None else compute_search_body(query, facets)
+
+
+def parse_facets(department=None, level=None, weight=None) -> Filters:
+    # departments the index can actually filter on, upserted courses included
+    departments = live_index.snapshot().facets.bitsets["department"].keys()
+    try:
+        return normalize_filters(department, level, weight, departments)
+    except FacetError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ---------- endpoint ----------
 @router.get("/search")
-async def search_courses(query: str = Query(..., min_length=1)):
+async def search_courses(
+    query: str = Query(..., min_length=1),
+    department: Optional[str] = Query(None, description='e.g. "CSC" or "CSC,MAT"'),
+    level: Optional[str] = Query(None, description='e.g. "300" or "3,4"'),
+    weight: Optional[str] = Query(None, description='"H" (half) or "Y" (full year)'),
+):
     try:
         query = query.strip()
         if not query:
             raise HTTPException(status_code=400, detail="Query cannot be empty")
+        facets = parse_facets(department, level, weight)
+        popularity.record("query", normalize_query(query))
+
+        body = peek_search_body(query, facets)
+        if body is None:
+            # encoder + ANN + sparse scoring run off the event loop
+            body = await cpu_executor.run(compute_search_body, query, facets)
+        return Response(content=body, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search error: {e}")
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=5000)
+    # facet filters applied to every query, same format as GET /search
+    department: Optional[str] = None
+    level: Optional[str] = None
+    weight: Optional[str] = None
 
-  
-        exact_hit = exact_course_lookup(query)
+
+def search_many_payload(queries: List[str], facets: Filters = ()) -> Dict[str, Any]:
+    results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+    pending: List[int] = []
+    for i, query in enumerate(queries):
+        if not query:
+            continue
+        exact_hit = exact_course_lookup(query, facets)
         if exact_hit:
-            return {"results": exact_hit}
+            results[i] = exact_hit
+        else:
+            pending.append(i)
+
+    if pending:
+        batch_hits = hybrid_search_many(
+            [queries[i] for i in pending],
+            facets=facets,
+            sparse_queries=[spell_corrected(queries[i]) for i in pending],
+        )
+        for i, hits in zip(pending, batch_hits):
+            results[i] = get_course_info_by_id(hits)
+
+    return {
+        "results": [
+            {"query": query, "results": hits}
+            for query, hits in zip(queries, results)
+        ]
+    }
 
 
-        hits = hybrid_search(query)           # List[(id, score)]
-        response = get_course_info_by_id(hits)
-        return {"results": response}
+@router.post("/search/batch")
+async def search_courses_batch(request: BatchSearchRequest):
+    """
+    Run many searches in one call. Exact course-code hits are resolved
+    directly; every other query goes through a single `hybrid_search_many`.
+    """
+    try:
+        queries = [q.strip() for q in request.queries]
+        facets = parse_facets(request.department, request.level, request.weight)
+        return await cpu_executor.run(search_many_payload, queries, facets)
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {e}")
+
+
+@router.get("/search/stats")
+def search_stats():
+    """Cache counters for the search pipeline."""
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "encode_batcher": encode_batcher.stats(),
+        "executor": cpu_executor.stats(),
+        "popularity": popularity.stats(),
+    }
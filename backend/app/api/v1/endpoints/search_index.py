@@ -0,0 +1,68 @@
+# search_index.py
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel, Field
+
+from app.services.cpu_executor import cpu_executor
+from v1.src.catalog import normalize_code
+from v1.src.search.hybrid_search import live_index
+
+router = APIRouter()
+
+# Maintenance routes change what every user searches, so they stay disabled
+# unless SEARCH_ADMIN_TOKEN is set; callers send it as X-Admin-Token.
+ADMIN_TOKEN: Optional[str] = os.getenv("SEARCH_ADMIN_TOKEN")
+
+
+def require_admin(token: Optional[str]) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Index maintenance is disabled")
+    if not token or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+class CourseUpsert(BaseModel):
+    title: str = Field(..., min_length=1)          # human-readable title, e.g. "Introduction to Programming"
+    description: Optional[str] = None
+    prerequisites: Optional[str] = None
+
+
+@router.put("/search/index/courses/{course_id}")
+async def upsert_course(
+    course_id: str, course: CourseUpsert, x_admin_token: Optional[str] = Header(None)
+):
+    """Add a course to the search index or replace its entry, without a rebuild."""
+    require_admin(x_admin_token)
+    code = normalize_code(course_id)
+    # same shape (and field naming) as a courses.json entry
+    payload = {
+        "course_code": course.title,
+        "title": code,
+        "description": course.description,
+        "prerequisites": course.prerequisites,
+    }
+    return await cpu_executor.run(live_index.upsert, code, course.title, payload)
+
+
+@router.delete("/search/index/courses/{course_id}")
+async def delete_course(course_id: str, x_admin_token: Optional[str] = Header(None)):
+    """Remove a course from search results (tombstoned until the next compaction)."""
+    require_admin(x_admin_token)
+    if not live_index.delete(course_id):
+        raise HTTPException(status_code=404, detail=f"Course {course_id} not in the search index")
+    return {"course": normalize_code(course_id), "version": live_index.version}
+
+
+@router.post("/search/index/compact")
+async def compact_index(x_admin_token: Optional[str] = Header(None)):
+    """Fold pending changes into freshly written index artifacts."""
+    require_admin(x_admin_token)
+    return await cpu_executor.run(live_index.compact)
+
+
+@router.get("/search/index")
+def index_status():
+    return live_index.stats()
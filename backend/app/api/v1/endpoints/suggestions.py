@@ -1,24 +1,45 @@
 # v1/src/api/suggestions.py
-from fastapi import APIRouter, Query, HTTPException
+import os
+from fastapi import APIRouter, Query, HTTPException, Request
 from typing import List
-from pathlib import Path
-import json
-from v1.src.search.autocomplete import autocomplete
+from app.services.http_cache import cached_response, make_cached_body
+from v1.src.catalog import get_catalog
+from v1.src.search.autocomplete import autocomplete, normalize_prefix
+from v1.src.search.cache import LRUCache
+from v1.src.search.popularity import popularity
 
 router = APIRouter()
 
+# Serialized bodies keyed by (catalog version, normalized prefix, k).  Ranking
+# also follows recent views, searches and typed prefixes, so entries (and
+# browser copies) only live for SUGGESTIONS_CACHE_TTL seconds; the ETag is a
+# hash of the body, so an unchanged list still revalidates with a 304.
+SUGGESTIONS_CACHE_TTL = int(os.getenv("SUGGESTIONS_CACHE_TTL", "60"))
+suggestions_cache = LRUCache(
+    max_size=int(os.getenv("SUGGESTIONS_CACHE_SIZE", "4096")),
+    ttl=SUGGESTIONS_CACHE_TTL,
+)
+
+
 @router.get("/suggestions", response_model=List[str])
 def get_suggestions(
+    request: Request,
     q: str = Query(..., min_length=1, max_length=100, description="User input"),
-    k: int = Query(10, ge=1, le=10, description="Max number of suggestions")
+    k: int = Query(10, ge=1, le=10, description="Max number of suggestions"),
 ):
     """
-    Return up to *k* autocomplete suggestions that start with the prefix *q*.
+    Return up to *k* autocomplete suggestions: codes and titles starting with
+    *q* first, then titles with a later word starting with *q*.
     """
     try:
-        suggestions = autocomplete(q)[:k]   
-        print(f"Query: {q}, Suggestions: {suggestions}")  # Debug print
-        return suggestions
+        prefix = normalize_prefix(q)
+        popularity.record("prefix", prefix)
+        key = (get_catalog().version, prefix, k)
+        cached = suggestions_cache.get(key)
+        if cached is None:
+            cached = make_cached_body(autocomplete(q, k))
+            suggestions_cache.put(key, cached)
+        return cached_response(request, cached, SUGGESTIONS_CACHE_TTL)
     except Exception as e:
         print(f"Error in suggestions endpoint: {str(e)}")  # Debug print
         raise HTTPException(status_code=500, detail=str(e))
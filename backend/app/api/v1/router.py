@@ -4,6 +4,8 @@ from app.api.v1.endpoints import search
 from app.api.v1.endpoints import graph
 from app.api.v1.endpoints import recommender
 from app.api.v1.endpoints import suggestions
+from app.api.v1.endpoints import course
+from app.api.v1.endpoints import search_index
 api_router = APIRouter()
 
 print("Registering routes...")
@@ -43,4 +45,14 @@ api_router.include_router(
     suggestions.router,
     prefix="",
     tags=["suggestions"]
-)
\ No newline at end of file
+)
+api_router.include_router(
+    course.router,
+    prefix="",
+    tags=["course"]
+)
+api_router.include_router(
+    search_index.router,
+    prefix="",
+    tags=["search-index"]
+)
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from fastapi import HTTPException
+
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool for CPU-heavy request work (encoder, FAISS, SciPy,
+    graph walks) so it never runs on the event loop.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more may
+    wait; beyond that `run` fails fast with a 503 instead of letting latency
+    grow without bound.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, name: str = "cpu"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._queue_wait_total = 0.0
+        self._run_time_total = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is busy, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._pending - self._running)
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._queue_wait_total += started - submitted
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._run_time_total += time.perf_counter() - started
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._pool, job)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_queue_wait_ms": 1000 * self._queue_wait_total / finished if finished else 0.0,
+                "avg_run_ms": 1000 * self._run_time_total / finished if finished else 0.0,
+            }
+
+
+cpu_executor = BoundedExecutor(
+    max_workers=int(os.getenv("CPU_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.getenv("CPU_EXECUTOR_QUEUE", "32")),
+)
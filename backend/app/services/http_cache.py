@@ -0,0 +1,65 @@
+"""
+Pre-serialized JSON bodies with strong ETags, for responses browsers and
+reverse proxies may cache.
+
+A ``CachedBody`` is built once per payload (and catalog version): the JSON
+bytes, a gzip copy when the body is big enough to be worth it, and an ETag
+hashed from the bytes.  ``cached_response`` answers a matching
+``If-None-Match`` with an empty 304 and otherwise sends the stored bytes,
+gzipped when the client accepts it, with ``Cache-Control`` and ``Vary``.
+"""
+import gzip
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+# bodies below this size are sent as-is; gzip would barely shrink them
+GZIP_MIN_BYTES = int(os.getenv("HTTP_GZIP_MIN_BYTES", "1024"))
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str                   # quoted, e.g. '"3f9c..."'
+
+    @property
+    def gzip_etag(self) -> str:
+        # each encoding is its own representation, so it needs its own strong tag
+        return self.etag[:-1] + '-gzip"'
+
+
+def make_cached_body(payload: Any) -> CachedBody:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    gzipped = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    return CachedBody(body, gzipped, etag)
+
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    """RFC 9110 weak comparison, as If-None-Match requires."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in tags for etag in etags)
+
+
+def cached_response(request: Request, cached: CachedBody, max_age: int) -> Response:
+    use_gzip = cached.gzipped is not None and "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": cached.gzip_etag if use_gzip else cached.etag,
+        "Cache-Control": f"public, max-age={max_age}",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), cached.etag, cached.gzip_etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=cached.gzipped, media_type="application/json", headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,10 +11,19 @@ from langchain_community.vectorstores import FAISS
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.output_parser import StrOutputParser
 from app.api.v1.router import api_router
+from v1.src.prereq.closure import get_closure
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # prerequisite graph + closure bitsets, so no request pays for the build
+    get_closure()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS for frontend integration
 app.add_middleware(
@@ -10,6 +10,7 @@ from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import normalize
 from node2vec import Node2Vec
 import sys
+from v1.src.catalog import get_catalog
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,9 +20,7 @@ DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
 
 
 def load_course_json() -> List[Dict[str, Any]]:
-    data_path = str(DOCUMENTS_DIR / "courses.json") 
-    with open(data_path, 'r') as f:
-        return json.load(f)
+    return list(get_catalog().courses)
 
 def load_cached_embeddings() -> Dict[str, np.ndarray]:
     data_path = str(DOCUMENTS_DIR / "course_embeddings.json") 
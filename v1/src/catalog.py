@@ -0,0 +1,152 @@
+"""
+Process-wide, read-only view of ``v1/files/courses.json``.
+
+courses.json is parsed once per process and indexed by normalized course
+code, normalized title, department and level, with the search result
+payload of every course precomputed.  Use ``get_catalog()`` instead of
+opening the file.
+
+Note the field naming in courses.json: ``"title"`` holds the course code
+(e.g. ``"CSC108H5"``) and ``"course_code"`` holds the human-readable title.
+The catalog API uses the meaning, not the key name.
+"""
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
+COURSES_PATH = DOCUMENTS_DIR / "courses.json"
+
+CODE_RE = re.compile(r"^([A-Z]{3})(\d)\d{2}")
+
+
+def normalize_code(code: str) -> str:
+    return re.sub(r"\s+", "", code).upper()
+
+
+def normalize_title(title: str) -> str:
+    return re.sub(r"\s+", " ", title.strip().lower())
+
+
+def course_code(course: Dict[str, Any]) -> str:
+    return course["title"]
+
+
+def course_title(course: Dict[str, Any]) -> str:
+    return course["course_code"]
+
+
+class CourseCatalog:
+    """Immutable course table with hash indexes; build once, share freely."""
+
+    def __init__(self, courses: List[Dict[str, Any]], version: str):
+        self.version = version
+        self.courses: Tuple[Dict[str, Any], ...] = tuple(courses)
+
+        by_code: Dict[str, int] = {}
+        by_title: Dict[str, int] = {}
+        by_code_prefix: Dict[str, List[int]] = {}
+        by_department: Dict[str, List[int]] = {}
+        by_level: Dict[int, List[int]] = {}
+        payloads: List[Dict[str, Any]] = []
+
+        for i, course in enumerate(self.courses):
+            code = normalize_code(course_code(course))
+            by_code.setdefault(code, i)
+            by_title.setdefault(normalize_title(course_title(course)), i)
+            # "CSC108", "CSC108H", "CSC108H5" all resolve to the first match,
+            # like the substring scan `exact_course_lookup` used to do
+            for end in range(6, len(code) + 1):
+                by_code_prefix.setdefault(code[:end], []).append(i)
+            match = CODE_RE.match(code)
+            if match:
+                by_department.setdefault(match.group(1), []).append(i)
+                by_level.setdefault(int(match.group(2)) * 100, []).append(i)
+            payloads.append(
+                {
+                    "course_code": course["course_code"],
+                    "title": course["title"],
+                    "description": course.get("description"),
+                    "prerequisites": course.get("prerequisites"),
+                }
+            )
+
+        self._by_code: Mapping[str, int] = MappingProxyType(by_code)
+        self._by_title: Mapping[str, int] = MappingProxyType(by_title)
+        self._by_code_prefix: Mapping[str, Tuple[int, ...]] = MappingProxyType(
+            {prefix: tuple(rows) for prefix, rows in by_code_prefix.items()}
+        )
+        self.departments: Mapping[str, Tuple[int, ...]] = MappingProxyType(
+            {dept: tuple(rows) for dept, rows in by_department.items()}
+        )
+        self.levels: Mapping[int, Tuple[int, ...]] = MappingProxyType(
+            {level: tuple(rows) for level, rows in by_level.items()}
+        )
+        self._payloads: Tuple[Dict[str, Any], ...] = tuple(payloads)
+
+    def __len__(self) -> int:
+        return len(self.courses)
+
+    def __iter__(self):
+        return iter(self.courses)
+
+    def index_of_code(self, code: str) -> Optional[int]:
+        return self._by_code.get(normalize_code(code))
+
+    def by_code(self, code: str) -> Optional[Dict[str, Any]]:
+        i = self._by_code.get(normalize_code(code))
+        return None if i is None else self.courses[i]
+
+    def by_title(self, title: str) -> Optional[Dict[str, Any]]:
+        i = self._by_title.get(normalize_title(title))
+        return None if i is None else self.courses[i]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look a course up by code or by title."""
+        return self.by_code(key) or self.by_title(key)
+
+    def by_code_prefix(self, code: str) -> Optional[Dict[str, Any]]:
+        """First course whose code starts with `code` (at least "ABC123")."""
+        rows = self._by_code_prefix.get(normalize_code(code))
+        return None if rows is None else self.courses[rows[0]]
+
+    def all_by_code_prefix(self, code: str) -> List[Dict[str, Any]]:
+        """Every course whose code starts with `code`, in file order."""
+        return [self.courses[i] for i in self._by_code_prefix.get(normalize_code(code), ())]
+
+    def in_department(self, department: str) -> List[Dict[str, Any]]:
+        return [self.courses[i] for i in self.departments.get(department.upper(), ())]
+
+    def at_level(self, level: int) -> List[Dict[str, Any]]:
+        return [self.courses[i] for i in self.levels.get(level, ())]
+
+    def search_payload(self, code: str) -> Optional[Dict[str, Any]]:
+        """The precomputed /search result entry for a course (without score)."""
+        i = self._by_code.get(normalize_code(code))
+        return None if i is None else self._payloads[i]
+
+
+def load_catalog(path: Path = COURSES_PATH) -> CourseCatalog:
+    raw = Path(path).read_bytes()
+    version = hashlib.sha256(raw).hexdigest()[:16]
+    return CourseCatalog(json.loads(raw), version)
+
+
+_catalog: Optional[CourseCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> CourseCatalog:
+    """The shared catalog, loaded on first use."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog()
+                print(f"[catalog] loaded {len(_catalog)} courses (version {_catalog.version})")
+    return _catalog
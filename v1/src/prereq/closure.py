@@ -0,0 +1,146 @@
+"""
+Transitive closure of the prerequisite graph as packed bitsets.
+
+Row ``u`` of ``descendants`` has bit ``v`` set when ``u`` is a (transitive)
+prerequisite of ``v``; ``ancestors`` is its transpose.  Rows are
+``np.packbits`` output (n × ceil(n/8) uint8, about 0.8 MB per direction
+for the full catalog), so a membership test is one byte lookup, a whole
+set is one row and unions over many courses are a single OR reduction.
+
+The link data has a few cycles (mutual prerequisites in the JAL/JLP/LIN
+courses), so the closure is computed over strongly connected components:
+members of a cyclic component reach each other and themselves, and
+components are filled in reverse topological order with one row OR per
+link between components.
+"""
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from v1.src.prereq.graph import PrereqGraph, get_prereq_graph
+
+
+def strongly_connected_components(graph: PrereqGraph) -> List[List[int]]:
+    """Tarjan's algorithm, iteratively; components come out sinks first."""
+    n = len(graph)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+    for root in range(n):
+        if index[root] >= 0:
+            continue
+        work = [(root, 0)]
+        while work:
+            u, i = work.pop()
+            if i == 0:
+                index[u] = low[u] = counter
+                counter += 1
+                stack.append(u)
+                on_stack[u] = True
+            children = graph.children(u)
+            while i < len(children):
+                v = children[i]
+                i += 1
+                if index[v] < 0:
+                    work.append((u, i))
+                    work.append((v, 0))
+                    break
+                if on_stack[v]:
+                    low[u] = min(low[u], index[v])
+            else:
+                if low[u] == index[u]:
+                    component = []
+                    while True:
+                        v = stack.pop()
+                        on_stack[v] = False
+                        component.append(v)
+                        if v == u:
+                            break
+                    components.append(component)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[u])
+    return components
+
+
+class TransitiveClosure:
+    def __init__(self, graph: PrereqGraph):
+        self.graph = graph
+        n = self.n = len(graph)
+        width = (n + 7) // 8
+        unit = np.packbits(np.eye(n, dtype=bool), axis=1)      # row v: only bit v
+
+        descendants = np.zeros((n, width), dtype=np.uint8)
+        for component in strongly_connected_components(graph):
+            members = np.bitwise_or.reduce(unit[component], axis=0)
+            row = np.zeros(width, dtype=np.uint8)
+            for u in component:
+                for v in graph.children(u):
+                    # v's own component is finished already unless it is this one
+                    row |= descendants[v] | unit[v]
+            if len(component) > 1 or any(u in graph.children(u) for u in component):
+                row |= members
+            descendants[component] = row
+        del unit
+
+        self.descendants = descendants
+        self.ancestors = np.packbits(
+            np.unpackbits(descendants, axis=1, count=n).T, axis=1
+        )
+
+    # -------- single course --------
+
+    def _ids(self, row: np.ndarray) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(row, count=self.n))
+
+    def ancestors_of(self, u: int) -> np.ndarray:
+        """Node ids of every transitive prerequisite of `u`."""
+        return self._ids(self.ancestors[u])
+
+    def descendants_of(self, u: int) -> np.ndarray:
+        """Node ids of every course `u` is a transitive prerequisite of."""
+        return self._ids(self.descendants[u])
+
+    def is_prereq(self, x: int, y: int) -> bool:
+        """Is `x` a (transitive) prerequisite of `y`?"""
+        return bool(self.ancestors[y, x >> 3] >> (7 - (x & 7)) & 1)
+
+    # -------- batched --------
+
+    def is_prereq_many(self, xs: Sequence[int], ys: Sequence[int]) -> np.ndarray:
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        return (self.ancestors[ys, xs >> 3] >> (7 - (xs & 7)) & 1).astype(bool)
+
+    def rows(self, us: Sequence[int], direction: str = "ancestors") -> np.ndarray:
+        """Unpacked (len(us) × n) bool matrix of the closure rows of `us`."""
+        bits = self.ancestors if direction == "ancestors" else self.descendants
+        return np.unpackbits(bits[np.asarray(us, dtype=np.int64)], axis=1, count=self.n).astype(bool)
+
+    def union(self, us: Sequence[int], direction: str = "ancestors") -> np.ndarray:
+        """Node ids in the closure of any of `us`."""
+        bits = self.ancestors if direction == "ancestors" else self.descendants
+        if len(us) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return self._ids(np.bitwise_or.reduce(bits[np.asarray(us, dtype=np.int64)], axis=0))
+
+
+_closure: Optional[TransitiveClosure] = None
+_closure_lock = threading.Lock()
+
+
+def get_closure() -> TransitiveClosure:
+    """
+    Closure of the shared prerequisite graph.  Built at app startup
+    (backend/main.py lifespan), else on first use.
+    """
+    global _closure
+    if _closure is None:
+        with _closure_lock:
+            if _closure is None:
+                _closure = TransitiveClosure(get_prereq_graph())
+    return _closure
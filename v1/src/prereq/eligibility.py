@@ -0,0 +1,122 @@
+"""
+Prerequisite rules of the whole catalog, compiled for vectorized checks.
+
+Every course's prerequisite string is parsed once (expressions.py) into
+AND-of-OR clauses and flattened into arrays over integer course ids:
+
+    clause_lits[clause_ptr[j]:clause_ptr[j+1]]   alternatives of clause j
+    clause_course[j]                             course (row) clause j belongs to
+
+For a boolean "completed" vector (or one row per student) a clause holds
+when any of its alternatives is completed -- one gather plus one
+``np.logical_or.reduceat`` -- and a course is open when none of its
+clauses fails, counted with one sparse product.  All 2.4k courses are
+checked at once.
+
+Course ids are those of the prerequisite graph (graph.py), extended with
+any code that only appears in prerequisite strings.
+"""
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from v1.src.catalog import course_code, get_catalog, normalize_code
+from v1.src.prereq.expressions import parse_clauses
+from v1.src.prereq.graph import get_prereq_graph
+
+
+class PrereqRules:
+    def __init__(self, courses: Sequence[dict], known_ids: Sequence[str] = (), version: str = ""):
+        self.version = version                 # of the catalog the rules come from
+        self.ids: List[str] = list(known_ids)
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(self.ids)}
+
+        def intern(code: str) -> int:
+            if code not in self.index:
+                self.index[code] = len(self.ids)
+                self.ids.append(code)
+            return self.index[code]
+
+        self.courses: List[str] = []           # row -> course code
+        clause_ptr = [0]
+        clause_lits: List[int] = []
+        clause_course: List[int] = []
+        for row, course in enumerate(courses):
+            code = normalize_code(course_code(course))
+            intern(code)
+            self.courses.append(code)
+            for clause in parse_clauses(course.get("prerequisites") or "none"):
+                clause_lits.extend(intern(c) for c in clause)
+                clause_ptr.append(len(clause_lits))
+                clause_course.append(row)
+
+        self.n_ids = len(self.ids)
+        self.course_ids = np.array([self.index[c] for c in self.courses], dtype=np.int64)
+        self.clause_ptr = np.array(clause_ptr, dtype=np.int64)
+        self.clause_lits = np.array(clause_lits, dtype=np.int64)
+        self.clause_course = np.array(clause_course, dtype=np.int64)
+        self.n_clauses = np.bincount(self.clause_course, minlength=len(self.courses))
+        # clause -> course incidence, to count failed clauses per course
+        self._incidence = csr_matrix(
+            (np.ones(len(self.clause_course), dtype=np.float32),
+             (np.arange(len(self.clause_course)), self.clause_course)),
+            shape=(len(self.clause_course), len(self.courses)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.courses)
+
+    def clauses(self, row: int) -> List[Tuple[int, ...]]:
+        """Clauses of course `row` as tuples of course ids."""
+        js = np.flatnonzero(self.clause_course == row)
+        return [tuple(self.clause_lits[self.clause_ptr[j]:self.clause_ptr[j + 1]].tolist()) for j in js]
+
+    def completed_mask(self, codes: Iterable[str]) -> Tuple[np.ndarray, List[str]]:
+        """Boolean vector over course ids, plus the codes no rule mentions."""
+        mask = np.zeros(self.n_ids, dtype=bool)
+        unknown: List[str] = []
+        for code in codes:
+            i = self.index.get(normalize_code(code))
+            if i is None:
+                unknown.append(code)
+            else:
+                mask[i] = True
+        return mask, unknown
+
+    def satisfied(self, completed: np.ndarray) -> np.ndarray:
+        """
+        Courses whose prerequisites `completed` meets, for a vector
+        (n_ids,) or a matrix (n_students × n_ids); same leading shape out.
+        """
+        completed = np.asarray(completed, dtype=bool)
+        single = completed.ndim == 1
+        completed = np.atleast_2d(completed)
+        if len(self.clause_lits) == 0:
+            out = np.ones((completed.shape[0], len(self.courses)), dtype=bool)
+        else:
+            lits = completed[:, self.clause_lits]
+            clause_ok = np.logical_or.reduceat(lits, self.clause_ptr[:-1], axis=1)
+            failed = self._incidence.T @ (~clause_ok).T.astype(np.float32)
+            out = np.asarray(failed).T == 0
+        return out[0] if single else out
+
+    def eligible(self, completed: np.ndarray) -> np.ndarray:
+        """satisfied() minus the courses already completed."""
+        return self.satisfied(completed) & ~np.asarray(completed, dtype=bool)[..., self.course_ids]
+
+
+_rules: Optional[PrereqRules] = None
+_rules_lock = threading.Lock()
+
+
+def get_rules() -> PrereqRules:
+    """Compiled rules of the shared catalog, built on first use and per catalog version."""
+    global _rules
+    catalog = get_catalog()
+    if _rules is None or _rules.version != catalog.version:
+        with _rules_lock:
+            if _rules is None or _rules.version != catalog.version:
+                _rules = PrereqRules(catalog.courses, get_prereq_graph().ids, catalog.version)
+    return _rules
@@ -0,0 +1,105 @@
+"""
+Prerequisite strings from courses.json as AND groups of OR alternatives
+(conjunctive normal form).
+
+    parse_prerequisites("CSC207H5and (MAT223H5orMAT240H5)")
+        -> ["CSC207H5", ["MAT223H5", "MAT240H5"]]
+    parse_prerequisites("POL218Y5or (POL218H5andPOL219H5)")
+        -> [["POL218Y5", "POL218H5"], ["POL218Y5", "POL219H5"]]
+
+The string is tokenized into course codes, "and", "or" and brackets;
+everything else is dropped, so requirements like "4.0 credits" or
+"permission of instructor" are not represented.  As before, "or" binds
+tighter than "and" ("A or B and C" means (A or B) and C).  Parsing is
+memoized per string.
+"""
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+PREREQ_CODE_RE = re.compile(r'[A-Z]{3}[0-9]{3}[HY][135]')
+# the scraped strings glue words to codes ("CSC207H5and (...)", "andMAT232H5"),
+# so and/or are operators unless part of a longer word ("understanding", "for")
+TOKEN_RE = re.compile(
+    r'(?P<code>[A-Z]{3}[0-9]{3}[HY][135])'
+    r'|(?P<and>(?<![A-Za-z])(?:and|AND|And)(?![a-z]))'
+    r'|(?P<or>(?<![A-Za-z])(?:or|OR|Or)(?![a-z]))'
+    r'|(?P<open>[(\[])|(?P<close>[)\]])'
+)
+
+Clause = Tuple[str, ...]          # alternatives, any one of which suffices
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = [(m.lastgroup, m.group()) for m in TOKEN_RE.finditer(text)]
+        self.pos = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def parse(self) -> List[Clause]:
+        clauses: List[Clause] = []
+        while self.pos < len(self.tokens):
+            clauses += self._conjunction()
+            self.pos += 1                               # stray ")" or operator
+        return clauses
+
+    def _conjunction(self) -> List[Clause]:
+        clauses = self._disjunction()
+        while self._peek() == "and":
+            self.pos += 1
+            clauses += self._disjunction()
+        return clauses
+
+    def _disjunction(self) -> List[Clause]:
+        options = [self._factor()]
+        # codes listed without an operator ("1.0 credit from A, B, C") are alternatives
+        while self._peek() in ("or", "code", "open"):
+            if self._peek() == "or":
+                self.pos += 1
+            options.append(self._factor())
+        # an operand without codes ("or permission of instructor") is dropped
+        options = [o for o in options if o]
+        if not options:
+            return []
+        # (a1 and a2) or (b1 and b2) == (a1 or b1) and (a1 or b2) and ...
+        clauses: List[Clause] = [()]
+        for option in options:
+            clauses = [tuple(dict.fromkeys(c + d)) for c in clauses for d in option]
+        return clauses
+
+    def _factor(self) -> List[Clause]:
+        kind = self._peek()
+        if kind == "code":
+            self.pos += 1
+            return [(self.tokens[self.pos - 1][1],)]
+        if kind == "open":
+            self.pos += 1
+            clauses = self._conjunction()
+            if self._peek() == "close":
+                self.pos += 1
+            return clauses
+        return []
+
+
+@lru_cache(maxsize=None)
+def parse_clauses(prereq_str: str) -> Tuple[Clause, ...]:
+    """Distinct CNF clauses of a prerequisite string, in order of appearance."""
+    if prereq_str.strip().lower() in ("", "none"):
+        return ()
+    clauses = list(dict.fromkeys(_Parser(prereq_str).parse()))
+    # a clause containing another one is implied by it
+    sets = [frozenset(c) for c in clauses]
+    return tuple(
+        c for c, s in zip(clauses, sets)
+        if not any(other < s for other in sets)
+    )
+
+
+def parse_prerequisites(prereq_str: str) -> List[Any]:
+    """AND list whose items are a code or a list of alternative codes."""
+    return [
+        clause[0] if len(clause) == 1 else list(clause)
+        for clause in parse_clauses(prereq_str or "none")
+    ]
@@ -0,0 +1,185 @@
+"""
+Compiled prerequisite graph (``v1/files/prereq_graph.json``).
+
+Course ids are mapped to integer node ids (their position in the node
+list) and the links to CSR adjacency in both directions:
+
+    fwd_ptr[u]:fwd_ptr[u+1]   slots of the links u -> v (u is a prerequisite of v)
+    rev_ptr[v]:rev_ptr[v+1]   slots of the links u -> v, looked up from v
+
+``fwd_dst`` / ``rev_src`` hold the other end of each slot and ``fwd_edge``
+/ ``rev_edge`` its index into ``links``, so subgraphs come back as the
+original node and link dicts, in file order.  Traversals are iterative
+and only touch the nodes and links they return.
+
+Use ``get_prereq_graph()`` instead of opening the file.
+"""
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
+GRAPH_PATH = DOCUMENTS_DIR / "prereq_graph.json"
+
+
+def _csr(keys: np.ndarray, values: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(ptr, values, edge ids) grouping `values` by `keys`, file order within a group."""
+    order = np.argsort(keys, kind="stable")
+    ptr = np.zeros(n + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum(np.bincount(keys, minlength=n))
+    return ptr, values[order].astype(np.int32), order.astype(np.int32)
+
+
+class PrereqGraph:
+    def __init__(self, nodes: List[Dict[str, Any]], links: List[Dict[str, Any]]):
+        self.nodes: List[Dict[str, Any]] = list(nodes)
+        self.links: List[Dict[str, Any]] = list(links)
+        self.index: Dict[str, int] = {}
+        for i, node in enumerate(self.nodes):
+            self.index.setdefault(node["id"], i)
+        for link in self.links:                         # endpoints missing from "nodes"
+            for end in (link["source"], link["target"]):
+                if end not in self.index:
+                    self.index[end] = len(self.nodes)
+                    self.nodes.append({"id": end})
+        self.ids: List[str] = [node["id"] for node in self.nodes]
+
+        n = len(self.nodes)
+        src = np.array([self.index[link["source"]] for link in self.links], dtype=np.int64)
+        dst = np.array([self.index[link["target"]] for link in self.links], dtype=np.int64)
+        self.src = src.astype(np.int32)
+        self.dst = dst.astype(np.int32)
+        self.fwd_ptr, self.fwd_dst, self.fwd_edge = _csr(src, dst, n)
+        self.rev_ptr, self.rev_src, self.rev_edge = _csr(dst, src, n)
+        # python lists for the per-request walks: indexing them is far
+        # cheaper than indexing numpy arrays one element at a time
+        self._fwd = [self.fwd_dst[a:b].tolist() for a, b in zip(self.fwd_ptr[:-1], self.fwd_ptr[1:])]
+        self._rev = [self.rev_src[a:b].tolist() for a, b in zip(self.rev_ptr[:-1], self.rev_ptr[1:])]
+        self._fwd_edges = [self.fwd_edge[a:b].tolist() for a, b in zip(self.fwd_ptr[:-1], self.fwd_ptr[1:])]
+        self._rev_edges = [self.rev_edge[a:b].tolist() for a, b in zip(self.rev_ptr[:-1], self.rev_ptr[1:])]
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __contains__(self, course_id: str) -> bool:
+        return course_id in self.index
+
+    def node_id(self, course_id: str) -> Optional[int]:
+        return self.index.get(course_id)
+
+    def parents(self, u: int) -> List[int]:
+        """Direct prerequisites of node `u`."""
+        return self._rev[u]
+
+    def children(self, u: int) -> List[int]:
+        """Courses that list node `u` as a direct prerequisite."""
+        return self._fwd[u]
+
+    # -------- traversal --------
+
+    def _reach(self, starts: Iterable[int], adjacency: List[List[int]]) -> Set[int]:
+        """Nodes reachable from `starts` in one or more steps (iterative DFS)."""
+        seen: Set[int] = set()
+        stack = list(starts)
+        while stack:
+            for v in adjacency[stack.pop()]:
+                if v not in seen:
+                    seen.add(v)
+                    stack.append(v)
+        return seen
+
+    def ancestors(self, u: int) -> Set[int]:
+        """Every transitive prerequisite of node `u`."""
+        return self._reach([u], self._rev)
+
+    def descendants(self, u: int) -> Set[int]:
+        """Every course node `u` is a transitive prerequisite of."""
+        return self._reach([u], self._fwd)
+
+    # -------- subgraphs --------
+
+    def payload(self, node_ids: Iterable[int], edge_ids: Iterable[int]) -> Dict[str, List[Dict[str, Any]]]:
+        """Node and link dicts for the given ids, in file order."""
+        return {
+            "nodes": [self.nodes[i] for i in sorted(set(node_ids))],
+            "links": [self.links[e] for e in edge_ids],
+        }
+
+    def ancestor_subgraph(self, course_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        All prerequisites of `course_id` with the links among them (and into
+        the course), plus the course's own outgoing links.
+        """
+        u = self.index.get(course_id)
+        if u is None:
+            return {"nodes": [], "links": []}
+        ancestors = self.ancestors(u)
+        # every parent of an ancestor is itself an ancestor, so the incoming
+        # links of ancestors and the course are exactly the links among them
+        related = sorted({e for v in ancestors | {u} for e in self._rev_edges[v]})
+        forward = self._fwd_edges[u]
+        node_ids = ancestors | {u} | set(self._fwd[u])
+        return self.payload(node_ids, related + forward)
+
+    def union_subgraph(self, seeds: Iterable[int]) -> Tuple[Set[int], List[int]]:
+        """
+        (node ids, link ids) of the union of ``ancestor_subgraph`` over all
+        `seeds`, from one multi-source walk.
+        """
+        seeds = set(seeds)
+        ancestors = self._reach(seeds, self._rev)
+        inside = ancestors | seeds
+        edges = {e for v in inside for e in self._rev_edges[v]}
+        node_ids = set(inside)
+        for u in seeds:
+            edges.update(self._fwd_edges[u])
+            node_ids.update(self._fwd[u])
+        return node_ids, sorted(edges)
+
+    def compact_payload(self, node_ids: Iterable[int], edge_ids: Sequence[int]) -> Dict[str, List[Any]]:
+        """
+        Same subgraph as ``payload`` as an id table plus parallel edge index
+        arrays: link k goes from nodes[source[k]] to nodes[target[k]].
+        """
+        order = np.array(sorted(set(node_ids)), dtype=np.int64)
+        position = np.full(len(self.nodes), -1, dtype=np.int64)
+        position[order] = np.arange(len(order))
+        edges = np.asarray(edge_ids, dtype=np.int64)
+        return {
+            "nodes": [self.ids[u] for u in order.tolist()],
+            "source": position[self.src[edges]].tolist(),
+            "target": position[self.dst[edges]].tolist(),
+        }
+
+    def direct_subgraph(self, course_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """`course_id` with its direct prerequisites and the courses it unlocks."""
+        u = self.index.get(course_id)
+        if u is None:
+            return {"nodes": [], "links": []}
+        edges = sorted(set(self._fwd_edges[u]) | set(self._rev_edges[u]))
+        return self.payload({u, *self._fwd[u], *self._rev[u]}, edges)
+
+
+def load_prereq_graph(path: Path = GRAPH_PATH) -> PrereqGraph:
+    with open(path, "r", encoding="utf-8") as f:
+        graph = json.load(f)
+    return PrereqGraph(graph["nodes"], graph["links"])
+
+
+_graph: Optional[PrereqGraph] = None
+_graph_lock = threading.Lock()
+
+
+def get_prereq_graph() -> PrereqGraph:
+    """The shared compiled graph, loaded on first use."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = load_prereq_graph()
+                print(f"[prereq] loaded {len(_graph)} courses, {len(_graph.links)} links")
+    return _graph
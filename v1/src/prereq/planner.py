@@ -0,0 +1,278 @@
+"""
+Term-by-term course plans on the compiled prerequisite rules.
+
+``Planner.plan`` works in three steps:
+
+1. cost: the number of courses still needed to take each course, memoized
+   per plan (0 when completed, 1 + the cheapest alternative of every
+   clause otherwise; courses outside the catalog or on a prerequisite
+   cycle cost infinity).  Walked iteratively.
+2. selection: starting from the targets, clauses with one alternative
+   are settled first; every other unmet clause then reuses a course
+   already planned, else takes the alternative settling the most open
+   clauses (cheapest on ties), so no clause adds a redundant course.
+3. layering: each term, the chosen courses whose prerequisites the
+   completed set meets (``PrereqRules.satisfied`` on a bool vector) are
+   placed, longest remaining chain first, up to the load limit.
+
+Only course-code prerequisites are modelled (see expressions.py); a full
+year (Y) course counts as two half courses of load in the term it starts.
+"""
+import copy
+import math
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from v1.src.catalog import normalize_code
+from v1.src.prereq.eligibility import PrereqRules, get_rules
+
+SEASONS = ("Winter", "Summer", "Fall")          # calendar order within a year
+TERM_RE = re.compile(r"^\s*(fall|winter|summer)\s*(\d{4})\s*$", re.I)
+
+
+def parse_term(term: str) -> Tuple[int, int]:
+    """Parse e.g. "Fall 2026" into (2026, 2); raises ValueError."""
+    match = TERM_RE.match(term)
+    if not match:
+        raise ValueError(f"term must look like 'Fall 2026', got {term!r}")
+    return int(match.group(2)), SEASONS.index(match.group(1).capitalize())
+
+
+def term_name(term: Tuple[int, int]) -> str:
+    return f"{SEASONS[term[1]]} {term[0]}"
+
+
+def next_term(term: Tuple[int, int], include_summer: bool) -> Tuple[int, int]:
+    year, season = term
+    season += 1 if include_summer or SEASONS[season] != "Winter" else 2
+    return (year + 1, 0) if season >= len(SEASONS) else (year, season)
+
+
+class Planner:
+    def __init__(self, rules: PrereqRules):
+        self.rules = rules
+        # course id -> catalog row; ids without a row are not offered
+        self.row_of: Dict[int, int] = {}
+        for row, u in enumerate(rules.course_ids.tolist()):
+            self.row_of.setdefault(u, row)
+        self.clauses_of: List[List[Tuple[int, ...]]] = [[] for _ in range(len(rules))]
+        ptr = rules.clause_ptr.tolist()
+        lits = rules.clause_lits.tolist()
+        for j, row in enumerate(rules.clause_course.tolist()):
+            self.clauses_of[row].append(tuple(lits[ptr[j]:ptr[j + 1]]))
+        self.load = [2 if len(code) > 6 and code[6] == "Y" else 1 for code in rules.ids]
+
+    def _clauses(self, u: int) -> List[Tuple[int, ...]]:
+        row = self.row_of.get(u)
+        return [] if row is None else self.clauses_of[row]
+
+    def costs(self, starts: Iterable[int], done: Set[int]) -> Dict[int, float]:
+        """Courses needed before and including each course reachable from `starts`."""
+        memo: Dict[int, float] = {}
+        active: Set[int] = set()
+        stack: List[Tuple[int, bool]] = [(u, False) for u in starts]
+        while stack:
+            u, leaving = stack.pop()
+            if u in memo:
+                continue
+            if u in done:
+                memo[u] = 0.0
+                continue
+            if u not in self.row_of:
+                memo[u] = math.inf                      # not offered
+                continue
+            if not leaving:
+                if u in active:
+                    continue                            # reached again through a cycle
+                active.add(u)
+                stack.append((u, True))
+                stack.extend((v, False) for clause in self._clauses(u) for v in clause if v not in memo)
+                continue
+            active.discard(u)
+            total = 1.0
+            for clause in self._clauses(u):
+                # an alternative still on the walk lies on a cycle through u
+                total += min((memo.get(v, math.inf) for v in clause), default=0.0)
+            memo[u] = total
+        return memo
+
+    def plan(
+        self,
+        targets: Sequence[str],
+        completed: Sequence[str] = (),
+        max_load: int = 5,
+        start_term: str = "Fall 2026",
+        include_summer: bool = False,
+        deadline: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        rules = self.rules
+        start = parse_term(start_term)
+        due = parse_term(deadline) if deadline else None
+        unknown = [c for c in list(targets) + list(completed) if normalize_code(c) not in rules.index]
+        done = {rules.index[normalize_code(c)] for c in completed if normalize_code(c) in rules.index}
+        goal = list(dict.fromkeys(
+            rules.index[normalize_code(c)] for c in targets if normalize_code(c) in rules.index
+        ))
+
+        cost = self.costs(goal, done)
+        unsatisfiable = [u for u in goal if math.isinf(cost[u])]
+        goal = [u for u in goal if not math.isinf(cost[u]) and u not in done]
+
+        # -------- selection --------
+        # a clause met by an already planned course adds nothing.  Clauses
+        # with a single alternative are settled first; each open choice after
+        # that takes a planned alternative if there is one, else the one that
+        # also settles the most other open clauses, then the cheapest.
+        chosen: Dict[int, List[int]] = {}               # course -> prerequisites it relies on
+        planned: Set[int] = set(goal)
+        pending = list(goal)
+        open_choices: List[Tuple[int, Tuple[int, ...]]] = []
+
+        def add(v: int) -> None:
+            if v not in planned:
+                planned.add(v)
+                pending.append(v)
+
+        while pending or open_choices:
+            if pending:
+                u = pending.pop()
+                chosen[u] = []
+                for clause in self._clauses(u):
+                    if any(v in done for v in clause):
+                        continue
+                    if len(clause) == 1:
+                        chosen[u].append(clause[0])
+                        add(clause[0])
+                    else:
+                        open_choices.append((u, clause))
+                continue
+            u, clause = open_choices.pop(0)
+            # not u itself ("FSC302H5 or FSC407H5" in FSC407H5's own rule)
+            v = next((v for v in clause if v in planned and v != u), None)
+            if v is None:
+                covers = Counter(w for _, other in open_choices for w in other)
+                v = min(clause, key=lambda w: (
+                    math.isinf(cost.get(w, math.inf)), -covers[w], cost.get(w, math.inf), rules.ids[w],
+                ))
+                add(v)
+            chosen[u].append(v)
+
+        # longest chain of chosen courses that still depends on each course
+        height: Dict[int, int] = {}
+        active = set()
+        stack = [(u, False) for u in chosen]
+        dependents: Dict[int, List[int]] = {u: [] for u in chosen}
+        for u, picks in chosen.items():
+            for v in picks:
+                dependents[v].append(u)
+        while stack:
+            u, leaving = stack.pop()
+            if u in height or (u in active and not leaving):
+                continue
+            if not leaving:
+                active.add(u)
+                stack.append((u, True))
+                stack.extend((w, False) for w in dependents[u] if w not in height)
+                continue
+            active.discard(u)
+            height[u] = 1 + max((height.get(w, 0) for w in dependents[u]), default=0)
+
+        # -------- layering --------
+        state = np.zeros(rules.n_ids, dtype=bool)
+        state[list(done)] = True
+        remaining = set(chosen)
+        terms: List[Dict[str, Any]] = []
+        term = start
+        while remaining:
+            open_rows = rules.satisfied(state)
+            available = sorted(
+                (u for u in remaining if open_rows[self.row_of[u]]),
+                key=lambda u: (-height[u], rules.ids[u]),
+            )
+            placed: List[int] = []
+            load = 0
+            for u in available:
+                if load + self.load[u] <= max_load or not placed:
+                    placed.append(u)
+                    load += self.load[u]
+            if not placed:
+                break                                   # left-over cycle; reported below
+            terms.append({"term": term_name(term), "courses": [rules.ids[u] for u in placed], "load": load})
+            remaining.difference_update(placed)
+            state[placed] = True
+            term = next_term(term, include_summer)
+
+        unsatisfiable += [u for u in goal if u in remaining]
+        finished = None
+        if terms and not unsatisfiable:
+            placed_in = {c: t["term"] for t in terms for c in t["courses"]}
+            finished = max((placed_in[rules.ids[u]] for u in goal), key=parse_term, default=None)
+        return {
+            "terms": terms,
+            "finished": finished,
+            "meets_deadline": None if due is None or finished is None else parse_term(finished) <= due,
+            "unsatisfiable": [rules.ids[u] for u in dict.fromkeys(unsatisfiable)],
+            "unknown": list(dict.fromkeys(unknown)),
+        }
+
+
+@lru_cache(maxsize=1024)
+def _plan_cached(version: str, targets: Tuple[str, ...], completed: FrozenSet[str], *options) -> Dict[str, Any]:
+    # `version` (of the rules) only keys the cache: plans of older rules are never hit again
+    return get_planner().plan(targets, sorted(completed), *options)
+
+
+def plan_courses(
+    targets: Sequence[str],
+    completed: Sequence[str] = (),
+    max_load: int = 5,
+    start_term: str = "Fall 2026",
+    include_summer: bool = False,
+    deadline: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    `Planner.plan` on the shared rules, memoized per rules version: advising
+    runs repeat the same (targets, record) profile for many students.  Each
+    call gets its own copy of the cached plan, with `unknown` listing the
+    codes as the caller spelled them.
+    """
+    rules = get_planner().rules
+    plan = copy.deepcopy(_plan_cached(
+        rules.version,
+        tuple(normalize_code(c) for c in targets),
+        frozenset(normalize_code(c) for c in completed),
+        max_load, start_term.strip().title(), include_summer, deadline and deadline.strip().title(),
+    ))
+    plan["unknown"] = list(dict.fromkeys(
+        c for c in list(targets) + list(completed) if normalize_code(c) not in rules.index
+    ))
+    return plan
+
+
+_planner: Optional[Planner] = None
+_planner_lock = threading.Lock()
+
+
+def get_planner() -> Planner:
+    """Planner over get_rules(), rebuilt when the rules are."""
+    global _planner
+    rules = get_rules()
+    if _planner is None or _planner.rules is not rules:
+        with _planner_lock:
+            if _planner is None or _planner.rules is not rules:
+                _planner = Planner(rules)
+    return _planner
+
+
+if __name__ == "__main__":
+    # MAT257Y5 alone covers MAT337H5's "MAT257Y5 or [...]": 5 courses, not 11
+    result = plan_courses(["MAT337H5"])
+    print(result)
+    assert sorted(c for term in result["terms"] for c in term["courses"]) == [
+        "MAT157H5", "MAT159H5", "MAT240H5", "MAT257Y5", "MAT337H5",
+    ]
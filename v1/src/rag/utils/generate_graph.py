@@ -18,6 +18,7 @@ from langchain_chroma import Chroma
 import json
 from networkx.readwrite import json_graph
 from langchain_core.documents import Document
+from v1.src.catalog import get_catalog
 
 client = openai.AsyncOpenAI()  # Optionally: api_key="YOUR_API_KEY"
 
@@ -58,8 +59,7 @@ def generate_graph(prereq_json_path: str):
     with open(prereq_json_path, "r") as f:
         prerequisites = json.load(f)
     # Create a dictionary to store course descriptions
-    with open(DOCUMENTS_DIR / "courses.json", encoding="utf-8") as f:
-        courses = {c["title"]: c for c in json.load(f)}
+    catalog = get_catalog()
     # print(courses)    
     # print(courses.get("CSC148H5"))
     G = nx.Graph()
@@ -67,7 +67,7 @@ def generate_graph(prereq_json_path: str):
     for node in prerequisites["nodes"]:
        
         
-        course = courses.get(node["id"])
+        course = catalog.by_code(node["id"])
         if course is None:
             # print(f"Warning: Course {node['id']} not found in courses.json")
             description = ""
@@ -1,65 +1,205 @@
-import json 
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
-import sys
+from typing import Dict, List, Optional, Tuple
 import os
+import threading
+
+import numpy as np
+
+from v1.src.catalog import course_code, course_title, get_catalog
+from v1.src.search.facets import course_facets
+from v1.src.search.fuzzy import CODE_LIKE_RE, WORD_RE, get_fuzzy_index
+from v1.src.search.popularity import popularity
+from v1.src.search.trie import CompactTrie
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
+# serialized trie (see trie.py); rebuilt whenever courses.json changes
+AUTOCOMPLETE_DIR = Path(os.getenv("AUTOCOMPLETE_DIR", DOCUMENTS_DIR / "autocomplete_index"))
+INFIX_DIR = AUTOCOMPLETE_DIR / "infix"
+
+# infix keys are "<title from a word start>\x1f<whole title>", so titles sharing
+# a tail ("... chemistry") stay distinct keys; \x1f never occurs in user input
+KEY_SEP = "\x1f"
+# score lost per word skipped before the match: "machine learning" ranks
+# "Machine Learning and Data Mining" above "Introduction to Machine Learning"
+WORD_POSITION_WEIGHT = 0.5
+# shorter queries already fill a page from the prefix trie
+MIN_INFIX_CHARS = 2
+# completions fetched per trie before re-ranking by recent demand
+CANDIDATES = 32
+# score added per log1p(decayed demand, see display_demand); ~1.4 views
+# outweigh one level step
+POPULARITY_WEIGHT = float(os.getenv("AUTOCOMPLETE_POPULARITY_WEIGHT", "0.5"))
+
+
+def course_score(course) -> float:
+    """Ranking score of a course's entries: lower-level (intro) courses first."""
+    return -course_facets(course.get('title', '')).get('level', 0) / 100
+
+
+def _key(text: str) -> str:
+    # titles are inconsistently spaced ("Organic Chemistry:  Mechanism ...")
+    return " ".join(text.lower().split())
+
+
+def build_entries(courses) -> Dict[str, Tuple[str, float]]:
+    """lowercase key -> (display text, score) for every course code and title."""
+    entries: Dict[str, Tuple[str, float]] = {}
+    for course in courses:
+        code = course.get('course_code', '')
+        title = course.get('title', '')
+        score = course_score(course)
+        for text in (code, title):
+            key = _key(text)
+            if key and score >= entries.get(key, ("", score))[1]:
+                entries[key] = (text, score)
+    return entries
+
+
+def build_infix_entries(courses) -> Dict[str, Tuple[str, float]]:
+    """Keys for every word start inside a title after the first (the prefix trie has that one)."""
+    entries: Dict[str, Tuple[str, float]] = {}
+    for course in courses:
+        title = course_title(course)
+        lower = _key(title)
+        score = course_score(course)
+        starts = [m.start() for m in WORD_RE.finditer(lower)]
+        for position, start in enumerate(starts[1:], 1):
+            key = lower[start:] + KEY_SEP + lower
+            entry_score = score - WORD_POSITION_WEIGHT * position
+            if entry_score >= entries.get(key, ("", entry_score))[1]:
+                entries[key] = (title, entry_score)
+    return entries
+
+
+def build_trie(directory: Path = AUTOCOMPLETE_DIR) -> CompactTrie:
+    catalog = get_catalog()
+    trie = CompactTrie.build(build_entries(catalog.courses), top_k=CANDIDATES)
+    trie.save(directory, catalog.version)
+    print(f"[autocomplete] wrote {len(trie)} entries to {directory}")
+    return trie
+
+
+def build_infix_trie(directory: Path = INFIX_DIR) -> CompactTrie:
+    catalog = get_catalog()
+    trie = CompactTrie.build(build_infix_entries(catalog.courses), top_k=CANDIDATES)
+    trie.save(directory, catalog.version)
+    print(f"[autocomplete] wrote {len(trie)} infix entries to {directory}")
+    return trie
 
-# Add the parent directory to sys.path to allow absolute imports
-current_dir = Path(__file__).resolve().parent
-parent_dir = current_dir.parent
-sys.path.append(str(parent_dir))
-
-from search.trie import Trie
-
-# Get the absolute path to the v1 directory
-V1_DIR = Path(__file__).resolve().parents[3] / "v1"
-DOCUMENTS_DIR = V1_DIR / "files"
-
-def load_course_json() -> List[Dict[str, Any]]:
-    """Load course data from the JSON file."""
-    data_path = str(DOCUMENTS_DIR / "courses.json")
-    print(f"Loading course data from: {data_path}")
-    try:
-        with open(data_path, 'r') as f:
-            data = json.load(f)
-            print(f"Successfully loaded {len(data)} courses")
-            return data
-    except Exception as e:
-        print(f"Error loading course data: {str(e)}")
-        return []
 
-# Build list of entries and mapping
-course_data = load_course_json()
-entry_map: Dict[str, str] = {}
-entries: List[str] = []
-for course in course_data:
-    code = course.get('course_code', '')
-    title = course.get('title', '')
-    if code:
-        entries.append(code.lower())
-        entry_map[code.lower()] = code
-    if title:
-        entries.append(title.lower())
-        entry_map[title.lower()] = title
-
-print(f"Prepared {len(entries)} entries for Trie (codes + titles)")
-
-# Initialize Trie
 _trie = None
+_infix_trie = None
+_trie_lock = threading.Lock()
+# (catalog version, display text -> course codes), for popularity lookups
+_display_codes: Tuple[Optional[str], Dict[str, List[str]]] = (None, {})
+
+
+def _load(directory: Path, build) -> CompactTrie:
+    if CompactTrie.saved_version(directory) != get_catalog().version:
+        build(directory)
+    return CompactTrie.load(directory)
+
 
-def get_trie() -> Trie:
+def get_trie() -> CompactTrie:
+    """The mapped trie, (re)built first if missing or from another courses.json."""
     global _trie
     if _trie is None:
-        print("Initializing Trie with course codes and titles")
-        _trie = Trie()
-        _trie.formTrie(entries)
-        print("Trie initialization complete")
+        with _trie_lock:
+            if _trie is None:
+                _trie = _load(AUTOCOMPLETE_DIR, build_trie)
     return _trie
 
-def autocomplete(prefix: str) -> List[str]:
-    prefix_lower = prefix.lower()
+
+def get_infix_trie() -> CompactTrie:
+    """Like get_trie, over the word starts inside titles."""
+    global _infix_trie
+    if _infix_trie is None:
+        with _trie_lock:
+            if _infix_trie is None:
+                _infix_trie = _load(INFIX_DIR, build_infix_trie)
+    return _infix_trie
+
+
+def normalize_prefix(prefix: str) -> str:
+    """Lowercase with runs of whitespace collapsed; a trailing space is kept (word finished)."""
+    collapsed = _key(prefix)
+    return collapsed + " " if collapsed and prefix[-1:].isspace() else collapsed
+
+
+def display_views(displays: List[str]) -> np.ndarray:
+    """Decayed view count of each suggestion (the most viewed course it names)."""
+    global _display_codes
+    catalog = get_catalog()
+    version, codes_of = _display_codes
+    if version != catalog.version:
+        codes_of = {}
+        for course in catalog.courses:
+            for text in (course_code(course), course_title(course)):
+                codes_of.setdefault(text, []).append(course_code(course))
+        _display_codes = (catalog.version, codes_of)
+    owners = [i for i, text in enumerate(displays) for _ in codes_of.get(text, ())]
+    codes = [code for text in displays for code in codes_of.get(text, ())]
+    views = np.zeros(len(displays))
+    np.maximum.at(views, np.array(owners, dtype=np.int64), popularity.counts("course", codes))
+    return views
+
+
+def display_demand(displays: List[str]) -> np.ndarray:
+    """
+    Recent demand for each suggestion: views of the course it names plus
+    /search queries and /suggestions prefixes typed out in full as its text.
+    """
+    keys = [_key(text) for text in displays]
+    return display_views(displays) + popularity.counts("query", keys) + popularity.counts("prefix", keys)
+
+
+def ranked(trie: CompactTrie, query: str, k: int) -> List[str]:
+    """Up to `k` completions from `trie`, build score plus a boost for recent demand."""
+    ids = trie.complete(query)
+    displays = [trie.display(i) for i in ids]
+    if POPULARITY_WEIGHT and displays:
+        demand = display_demand(displays)
+        if demand.any():
+            scores = trie.score[ids] + POPULARITY_WEIGHT * np.log1p(demand)
+            displays = [displays[i] for i in np.argsort(-scores, kind="stable")]
+    return displays[:k]
+
+
+def _merge(first: List[str], second: List[str], k: int) -> List[str]:
+    return list(dict.fromkeys(first + second))[:k]
+
+
+def complete(query: str, k: int = 10) -> List[str]:
+    """
+    Whole-string prefix matches first, then titles with a later word
+    starting with `query`, ranked by word position, score and popularity.
+    """
+    results = ranked(get_trie(), query, k)
+    if len(results) < k and len(query.strip()) >= MIN_INFIX_CHARS:
+        results = _merge(results, ranked(get_infix_trie(), query, CANDIDATES), k)
+    return results
+
+
+def autocomplete(prefix: str, k: int = 10) -> List[str]:
+    results = complete(normalize_prefix(prefix), k)
+    if not results:
+        results = fuzzy_autocomplete(prefix, k)
+    return results
+
+
+def fuzzy_autocomplete(prefix: str, k: int = 10) -> List[str]:
+    """Completions for a mistyped prefix: nearby course codes, or the prefix with its typos fixed."""
+    fuzzy = get_fuzzy_index()
     trie = get_trie()
-    results_lower = trie.autocomplete(prefix_lower)
-    results_original: List[str] = [entry_map[r] for r in results_lower]
-    return results_original
+    if CODE_LIKE_RE.match(prefix.strip()):
+        return [code for code in fuzzy.match_codes(prefix, k) if code.lower() in trie]
+    corrected = fuzzy.correct_text(prefix, last_is_prefix=True)
+    if not corrected or corrected == normalize_prefix(prefix).strip():
+        return []
+    return complete(corrected, k)
+
 
+if __name__ == "__main__":
+    build_trie()
+    build_infix_trie()
@@ -0,0 +1,125 @@
+"""
+Dynamic micro-batching for the query encoder.
+
+Request threads hand their texts to a ``MicroBatcher`` and block.  A single
+worker thread takes the first waiting request plus whatever else is queued,
+runs the encoder once on the whole batch and hands every caller back its
+own rows.  It only waits (up to ``max_wait_ms``, or until ``max_batch_size``
+texts are queued) when requests piled up during the previous batch: a lone
+request on an idle encoder is dispatched at once.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "encode-batcher",
+    ):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self._queue: "queue.Queue[Tuple[List[str], Future, float]]" = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.items = 0
+        self.max_batch_seen = 0
+        self.batch_size_counts: Dict[int, int] = {}
+        self._wait_total = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_wait_ms > 0 and self.max_batch_size > 1
+
+    def submit(self, texts: Sequence[str]) -> np.ndarray:
+        """Encode `texts`, possibly together with other callers' texts."""
+        texts = list(texts)
+        if not self.enabled or len(texts) >= self.max_batch_size:
+            self._record([(texts, None, time.perf_counter())], 0.0)
+            return self.fn(texts)
+
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((texts, future, time.perf_counter()))
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            # requests queued while the last batch ran: under load, worth waiting for more
+            loaded = not self._queue.empty()
+            first = self._queue.get()
+            batch = [first]
+            size = len(first[0])
+            deadline = time.perf_counter() + (self.max_wait_ms / 1000 if loaded else 0.0)
+            while size < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()     # already waiting, no wait added
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            started = time.perf_counter()
+            texts = [text for texts, _, _ in batch for text in texts]
+            try:
+                out = self.fn(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            self._record(batch, started)
+            offset = 0
+            for texts, future, _ in batch:
+                future.set_result(out[offset:offset + len(texts)])
+                offset += len(texts)
+
+    def _record(self, batch: List[Tuple[List[str], Any, float]], started: float) -> None:
+        size = sum(len(texts) for texts, _, _ in batch)
+        with self._stats_lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self.items += size
+            self.max_batch_seen = max(self.max_batch_seen, size)
+            self.batch_size_counts[size] = self.batch_size_counts.get(size, 0) + 1
+            if started:
+                self._wait_total += sum(started - submitted for _, _, submitted in batch)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "requests": self.requests,
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+                "max_batch_seen": self.max_batch_seen,
+                "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+                "avg_wait_ms": 1000 * self._wait_total / self.requests if self.requests else 0.0,
+                "queued": self._queue.qsize(),
+            }
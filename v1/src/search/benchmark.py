@@ -0,0 +1,335 @@
+"""
+Offline latency / relevance benchmark for the /search pipeline.
+
+Replays the shipped question datasets plus synthetic queries through the
+endpoint's own pipeline (``search_results``: exact code lookup, then
+``hybrid_search`` with spell correction on the sparse channels) and
+reports:
+
+* relevance per query set: MRR@k and recall@1 / recall@k;
+* latency per query set: p50 / p95 / p99 of sequential single-query calls;
+* throughput: queries/s and latency at several concurrency levels;
+* memory: RSS after start-up and at the end, plus the peak.
+
+Query sets (all seeded, so runs are comparable):
+
+    questions   both CSVs; questions naming a course ("PSY100") are labeled
+                with it, the rest only count towards latency
+    codes       "CSC108H5", "csc108", "CSC 108" style code lookups
+    titles      exact course titles
+    typos       course titles with one character edit in one word
+
+    python -m v1.src.search.benchmark --out run.json
+    python -m v1.src.search.benchmark --baseline run.json --fail-on-regression
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
+QUESTION_FILES = [
+    DOCUMENTS_DIR / "student_questions_dataset_250.csv",
+    DOCUMENTS_DIR / "academic_assistant_training_set.csv",
+]
+# search_results lives with the endpoint
+sys.path.append(str(ROOT_DIR / "backend"))
+
+CODE_IN_TEXT_RE = re.compile(r"\b([A-Z]{3})\s?(\d{3})")
+
+# (name, query, target course codes); an empty target is latency-only
+Query = Tuple[str, str, List[str]]
+
+
+# -------- query sets --------
+
+def question_queries(catalog, paths: Sequence[Path] = QUESTION_FILES) -> List[Query]:
+    queries: List[Query] = []
+    for path in paths:
+        for question in pd.read_csv(path)["question"].dropna():
+            targets = []
+            for dept, number in CODE_IN_TEXT_RE.findall(question):
+                course = catalog.by_code_prefix(dept + number)
+                if course:
+                    targets.append(course["title"])
+            queries.append(("questions", question, list(dict.fromkeys(targets))))
+    return queries
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    i = rng.randrange(len(word) - 1)
+    edit = rng.choice(("swap", "drop", "double", "replace"))
+    if edit == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if edit == "drop":
+        return word[:i] + word[i + 1:]
+    if edit == "double":
+        return word[:i] + word[i] + word[i:]
+    return word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i + 1:]
+
+
+def synthetic_queries(catalog, n: int, seed: int) -> List[Query]:
+    rng = random.Random(seed)
+    courses = rng.sample(list(catalog.courses), min(n, len(catalog)))
+    queries: List[Query] = []
+    for course in courses:
+        code, title = course["title"], course["course_code"]
+        variant = rng.choice((code, code[:6].lower(), f"{code[:3]} {code[3:6]}"))
+        queries.append(("codes", variant, [code]))
+        queries.append(("titles", title, [code]))
+        words = title.split()
+        long_words = [i for i, w in enumerate(words) if len(w) >= 5]
+        if long_words:
+            i = rng.choice(long_words)
+            words[i] = _typo(words[i], rng)
+            queries.append(("typos", " ".join(words), [code]))
+    return queries
+
+
+# -------- measurement --------
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:                                  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentiles(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    lat = np.asarray(latencies_ms)
+    return {
+        "n": int(len(lat)),
+        "mean_ms": float(lat.mean()),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p95_ms": float(np.percentile(lat, 95)),
+        "p99_ms": float(np.percentile(lat, 99)),
+    }
+
+
+def relevance(results: List[List[str]], targets: List[List[str]], k: int) -> Dict[str, float]:
+    reciprocal, recall_1, recall_k = [], [], []
+    for ranked, wanted in zip(results, targets):
+        ranked = ranked[:k]
+        rank = next((i for i, code in enumerate(ranked) if code in wanted), None)
+        reciprocal.append(0.0 if rank is None else 1.0 / (rank + 1))
+        recall_1.append(len(set(ranked[:1]) & set(wanted)) / len(wanted))
+        recall_k.append(len(set(ranked) & set(wanted)) / len(wanted))
+    return {
+        "n": len(targets),
+        f"mrr@{k}": float(np.mean(reciprocal)),
+        "recall@1": float(np.mean(recall_1)),
+        f"recall@{k}": float(np.mean(recall_k)),
+    }
+
+
+def replay(
+    search: Callable[[str], List[str]], queries: List[Query], concurrency: int
+) -> Tuple[List[List[str]], List[float], float]:
+    """Run every query; returns (ranked codes, per-query latency ms, wall seconds)."""
+
+    def timed(query: str) -> Tuple[List[str], float]:
+        start = time.perf_counter()
+        ranked = search(query)
+        return ranked, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if concurrency <= 1:
+        out = [timed(q) for _, q, _ in queries]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            out = list(pool.map(timed, [q for _, q, _ in queries]))
+    wall = time.perf_counter() - start
+    return [ranked for ranked, _ in out], [ms for _, ms in out], wall
+
+
+def run_benchmark(
+    n_synthetic: int = 200,
+    seed: int = 0,
+    k: int = 10,
+    concurrency: Sequence[int] = (1, 4, 8, 16),
+    warm_cache: bool = False,
+) -> Dict[str, Any]:
+    from app.api.v1.endpoints.search import search_results
+    from v1.src.catalog import get_catalog
+    from v1.src.search import hybrid_search as hs
+
+    startup_rss = _rss_mb()
+    catalog = get_catalog()
+    queries = question_queries(catalog) + synthetic_queries(catalog, n_synthetic, seed)
+
+    def search(query: str) -> List[str]:
+        return [course["title"] for course in search_results(query, top_n=k)]
+
+    def reset() -> None:
+        if not warm_cache:
+            hs.embedding_cache.clear()
+
+    search(queries[0][1])                                # warm-up (lazy init)
+    reset()
+    results, latencies, _ = replay(search, queries, concurrency=1)
+
+    sets = list(dict.fromkeys(name for name, _, _ in queries))
+    report: Dict[str, Any] = {"relevance": {}, "latency": {}, "throughput": []}
+    for name in sets:
+        rows = [i for i, q in enumerate(queries) if q[0] == name]
+        labeled = [i for i in rows if queries[i][2]]
+        if labeled:
+            report["relevance"][name] = relevance(
+                [results[i] for i in labeled], [queries[i][2] for i in labeled], k
+            )
+        report["latency"][name] = _percentiles([latencies[i] for i in rows])
+    report["latency"]["all"] = _percentiles(latencies)
+
+    for level in concurrency:
+        reset()
+        _, level_latencies, wall = replay(search, queries, level)
+        report["throughput"].append(
+            {"concurrency": level, "qps": len(queries) / wall, **_percentiles(level_latencies)}
+        )
+
+    report["memory"] = {"startup_rss_mb": startup_rss, "rss_mb": _rss_mb(), "peak_rss_mb": _peak_rss_mb()}
+    report["meta"] = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "index_version": hs.index_version(),
+        "catalog_version": catalog.version,
+        "encoder": hs.ENCODER_ID,
+        "dense_backend": hs.live_index.snapshot().dense_index.backend,
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "n_queries": len(queries),
+        "n_synthetic": n_synthetic,
+        "seed": seed,
+        "k": k,
+        "warm_cache": warm_cache,
+    }
+    return report
+
+
+# -------- baseline comparison --------
+
+def _flatten(report: Dict[str, Any]) -> Dict[str, float]:
+    flat: Dict[str, float] = {}
+    for section in ("relevance", "latency", "memory"):
+        for name, value in report.get(section, {}).items():
+            if isinstance(value, dict):
+                for metric, number in value.items():
+                    if metric != "n":
+                        flat[f"{section}.{name}.{metric}"] = number
+            elif value is not None:
+                flat[f"{section}.{name}"] = value
+    for row in report.get("throughput", []):
+        for metric in ("qps", "p95_ms"):
+            flat[f"throughput.c{row['concurrency']}.{metric}"] = row[metric]
+    return flat
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.startswith("relevance.") or metric.endswith(".qps")
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_latency_ms: float = 1.0
+) -> List[Dict[str, Any]]:
+    """
+    Metric-by-metric diff against a stored run.  Relevance regresses when it
+    drops by more than ``tolerance`` absolute; latency, memory and
+    throughput when they get worse by more than ``tolerance`` relative
+    (latency also by at least ``min_latency_ms``, so timer noise on
+    sub-millisecond lookups is not reported).
+    """
+    cur, base = _flatten(current), _flatten(baseline)
+    rows = []
+    for metric in sorted(cur.keys() & base.keys()):
+        old, new = base[metric], cur[metric]
+        if metric.startswith("relevance."):
+            worse = old - new > tolerance
+        elif _higher_is_better(metric):
+            worse = old > 0 and (old - new) / old > tolerance
+        else:
+            worse = old > 0 and (new - old) / old > tolerance
+            if metric.endswith("_ms"):
+                worse = worse and new - old >= min_latency_ms
+        rows.append({"metric": metric, "baseline": old, "current": new, "regressed": bool(worse)})
+    return rows
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Search latency / relevance benchmark")
+    parser.add_argument("--n-synthetic", type=int, default=200, help="courses sampled for code/title/typo queries")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4, 8, 16])
+    parser.add_argument("--warm-cache", action="store_true", help="keep the embedding cache between passes")
+    parser.add_argument("--out", type=Path, help="write the report here")
+    parser.add_argument("--baseline", type=Path, help="report of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--min-latency-ms", type=float, default=1.0)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.n_synthetic, args.seed, args.k, args.concurrency, args.warm_cache)
+
+    meta = report["meta"]
+    print(f"{meta['n_queries']} queries, index {meta['index_version']}, {meta['encoder']}, {meta['dense_backend']}")
+    for name, rel in report["relevance"].items():
+        scores = "  ".join(f"{key}={value:.3f}" for key, value in rel.items() if key != "n")
+        print(f"relevance {name:10s} n={rel['n']:<4d} {scores}")
+    for name, lat in report["latency"].items():
+        print(f"latency   {name:10s} n={lat['n']:<4d} p50={lat['p50_ms']:.2f}ms "
+              f"p95={lat['p95_ms']:.2f}ms p99={lat['p99_ms']:.2f}ms")
+    for row in report["throughput"]:
+        print(f"throughput c={row['concurrency']:<3d} {row['qps']:8.1f} q/s  p95={row['p95_ms']:.2f}ms")
+    print("memory    " + "  ".join(
+        f"{key}={value:.0f}" for key, value in report["memory"].items() if value is not None
+    ))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"] = {"baseline": str(args.baseline), "tolerance": args.tolerance,
+                                "metrics": compare(report, baseline, args.tolerance, args.min_latency_ms)}
+        regressions = [row for row in report["comparison"]["metrics"] if row["regressed"]]
+        for row in regressions:
+            print(f"REGRESSION {row['metric']}: {row['baseline']:.4f} -> {row['current']:.4f}")
+        if not regressions:
+            print(f"no regressions against {args.baseline} (tolerance {args.tolerance})")
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
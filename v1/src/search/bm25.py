@@ -0,0 +1,78 @@
+"""
+Full-text BM25 channel backed by the prebuilt bm25s index in
+``backend/bm25s_very_big_index/``.
+
+bm25s stores the already-weighted BM25 scores as a CSC matrix: column ``t``
+of ``data/indices/indptr`` is the posting list of token ``t``.  A query score
+is just the sum of its tokens' postings, so the arrays are memory-mapped and
+only the postings of the query tokens are ever touched.
+
+Passages (course line, description, prerequisites) are mapped back to the
+course they belong to and their scores summed per course.
+"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from v1.src.search.postings import PostingsIndex, term_query_matrix
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+BM25_DIR = Path(os.getenv("SEARCH_BM25_DIR", ROOT_DIR / "backend" / "bm25s_very_big_index"))
+
+# bm25s' default tokenizer: lowercase, words of 2+ word chars
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+COURSE_LINE = '"text":"Course: '
+
+
+class BM25Index:
+    def __init__(self, index_dir: Path, doc_ids: Sequence[str]):
+        index_dir = Path(index_dir)
+        self.postings = PostingsIndex(
+            np.load(index_dir / "indptr.csc.index.npy", mmap_mode="r"),
+            np.load(index_dir / "indices.csc.index.npy", mmap_mode="r"),
+            np.load(index_dir / "data.csc.index.npy", mmap_mode="r"),
+        )
+        with open(index_dir / "vocab.index.json", encoding="utf-8") as f:
+            self.vocab: Dict[str, int] = json.load(f)
+        self.passage_doc = self._map_passages(index_dir / "corpus.jsonl", doc_ids)
+
+    @staticmethod
+    def _map_passages(corpus_path: Path, doc_ids: Sequence[str]) -> np.ndarray:
+        """passage id -> row in `doc_ids` (or -1), following the "Course: X" headers."""
+        row_of = {code: i for i, code in enumerate(doc_ids)}
+        mapping: List[int] = []
+        current = -1
+        with open(corpus_path, encoding="utf-8") as f:
+            for line in f:
+                start = line.find(COURSE_LINE)
+                if start != -1:
+                    code = line[start + len(COURSE_LINE):].split(" ", 1)[0]
+                    current = row_of.get(code, -1)
+                mapping.append(current)
+        return np.asarray(mapping, dtype=np.int64)
+
+    def tokenize(self, query: str) -> List[int]:
+        tokens = dict.fromkeys(TOKEN_RE.findall(query.lower()))
+        return [self.vocab[t] for t in tokens if t in self.vocab]
+
+    def search_many(
+        self, queries: Sequence[str], k: int, doc_map: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (ids, scores) of shape (n_queries × k), best first, -1 padded.
+        ``doc_map`` replaces `passage_doc`, e.g. with a live index's row ids.
+        """
+        q = term_query_matrix([self.tokenize(query) for query in queries], self.postings.n_terms)
+        return self.postings.search_many(q, k, doc_map=self.passage_doc if doc_map is None else doc_map)
+
+
+def load_bm25(doc_ids: Sequence[str], index_dir: Path = BM25_DIR):
+    """The BM25 channel, or None when the bm25s index is not shipped."""
+    if not (Path(index_dir) / "vocab.index.json").exists():
+        print(f"[bm25] no bm25s index at {index_dir}; BM25 channel disabled")
+        return None
+    return BM25Index(index_dir, doc_ids)
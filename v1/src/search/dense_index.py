@@ -0,0 +1,279 @@
+"""
+Dense (embedding) index backends for hybrid search.
+
+``flat`` is an exact inner-product scan straight over the memory-mapped
+matrix.  ``hnsw`` and ``ivf`` are FAISS approximate indexes that are built
+once from the same matrix, persisted next to the other artifacts and
+reloaded on start-up.  The backend and its knobs come from the environment:
+
+    SEARCH_DENSE_BACKEND   flat | hnsw | ivf          (default flat)
+    SEARCH_HNSW_M          graph degree               (default 32)
+    SEARCH_HNSW_EF_CONSTRUCTION                       (default 200)
+    SEARCH_HNSW_EF_SEARCH  search beam width          (default 64)
+    SEARCH_IVF_NLIST       number of clusters         (default ~4*sqrt(n))
+    SEARCH_IVF_NPROBE      clusters visited per query (default 8)
+
+Run ``python -m v1.src.search.dense_index`` to compare settings: it reports
+recall@k against the flat index and p50/p99 single-query latency.
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BACKENDS = ("flat", "hnsw", "ivf")
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def default_params(backend: str) -> Dict[str, Any]:
+    if backend == "hnsw":
+        return {
+            "M": _env_int("SEARCH_HNSW_M", 32),
+            "ef_construction": _env_int("SEARCH_HNSW_EF_CONSTRUCTION", 200),
+            "ef_search": _env_int("SEARCH_HNSW_EF_SEARCH", 64),
+        }
+    if backend == "ivf":
+        return {
+            "nlist": _env_int("SEARCH_IVF_NLIST", None),
+            "nprobe": _env_int("SEARCH_IVF_NPROBE", 8),
+        }
+    return {}
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k of a (n_queries × n_docs) score matrix, best first."""
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+class FlatDenseIndex:
+    """Exact search over the mapped matrix; shares pages across workers."""
+
+    backend = "flat"
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+        self.params: Dict[str, Any] = {}
+
+    @property
+    def ntotal(self) -> int:
+        return self.vectors.shape[0]
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (scores, ids) like `faiss.Index.search`."""
+        ids, scores = top_k_rows(queries @ self.vectors.T, k)
+        return scores, ids
+
+    def set_search_params(self, **params: Any) -> None:
+        pass
+
+
+class FaissDenseIndex:
+    """HNSW or IVF index; search-time knobs can be changed on the fly."""
+
+    def __init__(self, backend: str, index: Any, params: Dict[str, Any]):
+        self.backend = backend
+        self.index = index
+        self.params = dict(params)
+        self.set_search_params(**params)
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.index.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+
+    def set_search_params(self, **params: Any) -> None:
+        if self.backend == "hnsw" and params.get("ef_search"):
+            self.index.hnsw.efSearch = int(params["ef_search"])
+            self.params["ef_search"] = int(params["ef_search"])
+        if self.backend == "ivf" and params.get("nprobe"):
+            self.index.nprobe = int(params["nprobe"])
+            self.params["nprobe"] = int(params["nprobe"])
+
+
+def build_faiss_index(backend: str, vectors: np.ndarray, params: Dict[str, Any]) -> Any:
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    if backend == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, int(params["M"]), faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = int(params["ef_construction"])
+    elif backend == "ivf":
+        nlist = params.get("nlist") or max(1, int(4 * np.sqrt(n)))
+        nlist = min(nlist, n)
+        params["nlist"] = nlist
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+    else:
+        raise ValueError(f"Unknown ANN backend {backend!r}; expected one of {BACKENDS}")
+    index.add(vectors)
+    return index
+
+
+def _build_params_key(backend: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Parameters that are baked into the persisted file (not search-time)."""
+    if backend == "hnsw":
+        return {"M": params["M"], "ef_construction": params["ef_construction"]}
+    if backend == "ivf":
+        return {"nlist": params.get("nlist")}
+    return {}
+
+
+def _is_current(meta: Dict[str, Any], version: str, backend: str, params: Dict[str, Any]) -> bool:
+    if meta.get("version") != version:
+        return False
+    for key, value in _build_params_key(backend, params).items():
+        if value is not None and meta["build"].get(key) != value:
+            return False
+    return True
+
+
+def load_dense_index(
+    vectors: np.ndarray,
+    index_dir: Path,
+    version: str,
+    backend: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+):
+    """
+    Return the configured dense backend, building and persisting the FAISS
+    file the first time (or whenever the artifact version or build
+    parameters change).
+    """
+    backend = backend or os.getenv("SEARCH_DENSE_BACKEND", "flat")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown dense backend {backend!r}; expected one of {BACKENDS}")
+    if backend == "flat":
+        return FlatDenseIndex(vectors)
+
+    import faiss
+
+    params = {**default_params(backend), **(params or {})}
+    index_path = Path(index_dir) / f"dense.{backend}.faiss"
+    meta_path = Path(index_dir) / f"dense.{backend}.json"
+
+    if index_path.exists() and meta_path.exists():
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if _is_current(meta, version, backend, params):
+            flags = faiss.IO_FLAG_MMAP if backend == "ivf" else 0
+            index = faiss.read_index(str(index_path), flags)
+            params.update(meta["build"])
+            return FaissDenseIndex(backend, index, params)
+
+    print(f"[dense_index] building {backend} index over {vectors.shape[0]} vectors")
+    index = build_faiss_index(backend, vectors, params)
+    # replace, never rewrite in place: a live IVF index may have the old file mapped
+    tmp_path = index_path.with_name(index_path.name + ".tmp")
+    faiss.write_index(index, str(tmp_path))
+    os.replace(tmp_path, index_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "build": _build_params_key(backend, params)}, f)
+    return FaissDenseIndex(backend, index, params)
+
+
+# ---------- benchmark ----------
+
+def _sample_queries(vectors: np.ndarray, n: int, noise: float, seed: int) -> np.ndarray:
+    """Perturbed copies of stored vectors, so queries are near but not on the data."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(vectors.shape[0], size=min(n, vectors.shape[0]), replace=False)
+    q = np.asarray(vectors[rows], dtype=np.float32)
+    q = q + noise * rng.standard_normal(q.shape).astype(np.float32)
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+
+def benchmark(
+    index: Any, queries: np.ndarray, truth: np.ndarray, k: int
+) -> Dict[str, float]:
+    latencies: List[float] = []
+    found: List[np.ndarray] = []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    hits = sum(len(np.intersect1d(f, t)) for f, t in zip(found, truth))
+    lat_ms = np.array(latencies) * 1000
+    return {
+        f"recall@{k}": hits / truth.size,
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from v1.src.search.index_store import INDEX_DIR, load_index
+
+    parser = argparse.ArgumentParser(description="Dense index recall/latency report")
+    parser.add_argument("--index-dir", type=Path, default=INDEX_DIR)
+    parser.add_argument("--queries", type=Path, help=".npy of query vectors (default: perturbed docs)")
+    parser.add_argument("--n-queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-search", type=_int_list, default=[16, 32, 64, 128])
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=_int_list, default=[1, 4, 8, 16, 32])
+    parser.add_argument("--json", type=Path, help="also write the report here")
+    args = parser.parse_args(argv)
+
+    artifacts = load_index(args.index_dir)
+    vectors = artifacts.dense
+    if args.queries:
+        queries = np.load(args.queries).astype(np.float32)
+    else:
+        queries = _sample_queries(vectors, args.n_queries, args.noise, seed=0)
+
+    flat = FlatDenseIndex(vectors)
+    _, truth = flat.search(queries, args.k)
+
+    report: List[Dict[str, Any]] = [{"backend": "flat", **benchmark(flat, queries, truth, args.k)}]
+    hnsw = load_dense_index(
+        vectors, args.index_dir, artifacts.version, "hnsw", {"M": args.hnsw_m}
+    )
+    for ef in args.ef_search:
+        hnsw.set_search_params(ef_search=ef)
+        report.append({"backend": "hnsw", "M": args.hnsw_m, "ef_search": ef,
+                       **benchmark(hnsw, queries, truth, args.k)})
+    ivf = load_dense_index(
+        vectors, args.index_dir, artifacts.version, "ivf", {"nlist": args.nlist}
+    )
+    for nprobe in args.nprobe:
+        ivf.set_search_params(nprobe=nprobe)
+        report.append({"backend": "ivf", "nlist": ivf.params["nlist"], "nprobe": nprobe,
+                       **benchmark(ivf, queries, truth, args.k)})
+
+    print(f"{len(queries)} queries, {vectors.shape[0]} vectors, k={args.k}")
+    for row in report:
+        knobs = ", ".join(f"{key}={row[key]}" for key in ("M", "ef_search", "nlist", "nprobe") if key in row)
+        print(
+            f"{row['backend']:5s} {knobs:28s} recall@{args.k}={row[f'recall@{args.k}']:.3f} "
+            f"p50={row['p50_ms']:.3f}ms p99={row['p99_ms']:.3f}ms"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Query/document encoder backends for hybrid search.
+
+``torch`` is the reference ``SentenceTransformer`` model.  ``onnx`` serves
+the same model from a local ONNX export (int8 dynamically quantized by
+default) through onnxruntime and the ``tokenizers`` library, so the server
+never imports torch.  Pick one with ``SEARCH_ENCODER_BACKEND`` (default
+``torch``).
+
+    python -m v1.src.search.encoder export     # one-off, needs torch + transformers
+    python -m v1.src.search.encoder parity     # cosine agreement vs. torch
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_DIR = Path(os.getenv("SEARCH_ONNX_DIR", ROOT_DIR / "v1" / "files" / "encoder_onnx"))
+ONNX_FILE = "model.onnx"
+ONNX_INT8_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+MAX_SEQ_LENGTH = 256                 # all-MiniLM-L6-v2's sentence-transformers setting
+
+
+class TorchEncoder:
+    backend = "torch"
+
+    def __init__(self, model_id: str = MODEL_ID):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_id)
+
+    def encode(self, texts, normalize_embeddings: bool = False, batch_size: int = 32):
+        return self.model.encode(texts, normalize_embeddings=normalize_embeddings, batch_size=batch_size)
+
+
+class OnnxEncoder:
+    """Tokenize -> ONNX BERT -> mean pooling (-> L2 normalize), like the ST pipeline."""
+
+    backend = "onnx"
+
+    def __init__(self, onnx_dir: Path = ONNX_DIR, quantized: bool = True, threads: Optional[int] = None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        onnx_dir = Path(onnx_dir)
+        self.model_path = onnx_dir / (ONNX_INT8_FILE if quantized else ONNX_FILE)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            str(self.model_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(onnx_dir / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+    def _encode_batch(self, texts: List[str], normalize: bool) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+        attention = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]                 # batch × seq × dim
+
+        mask = attention[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(
+        self,
+        texts: Union[str, Sequence[str]],
+        normalize_embeddings: bool = False,
+        batch_size: int = 32,
+    ) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, self.session.get_outputs()[0].shape[-1] or 384), dtype=np.float32)
+        out = np.vstack([
+            self._encode_batch(texts[i:i + batch_size], normalize_embeddings)
+            for i in range(0, len(texts), batch_size)
+        ])
+        return out[0] if single else out
+
+
+def export_onnx(onnx_dir: Path = ONNX_DIR, model_id: str = MODEL_ID, quantize: bool = True) -> Path:
+    """Export the transformer to ONNX (and an int8 copy). Needs torch + transformers once."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    onnx_dir = Path(onnx_dir)
+    onnx_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModel.from_pretrained(model_id).eval()
+
+    sample = tokenizer(["an example query"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in names),
+            str(onnx_dir / ONNX_FILE),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=14,
+        )
+    tokenizer.backend_tokenizer.save(str(onnx_dir / TOKENIZER_FILE))
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(
+            str(onnx_dir / ONNX_FILE), str(onnx_dir / ONNX_INT8_FILE), weight_type=QuantType.QInt8
+        )
+    print(f"[encoder] exported {model_id} to {onnx_dir}")
+    return onnx_dir
+
+
+def load_encoder(backend: Optional[str] = None):
+    """The configured encoder; the ONNX artifact is exported on first use if missing."""
+    backend = backend or os.getenv("SEARCH_ENCODER_BACKEND", "torch")
+    if backend == "torch":
+        return TorchEncoder()
+    if backend == "onnx":
+        quantized = os.getenv("SEARCH_ONNX_QUANTIZED", "1") != "0"
+        model_file = ONNX_DIR / (ONNX_INT8_FILE if quantized else ONNX_FILE)
+        if not model_file.exists() or not (ONNX_DIR / TOKENIZER_FILE).exists():
+            print(f"[encoder] no ONNX artifact at {model_file}; exporting once")
+            export_onnx(ONNX_DIR, quantize=quantized)
+        return OnnxEncoder(ONNX_DIR, quantized=quantized)
+    raise ValueError(f"Unknown encoder backend {backend!r}; expected 'torch' or 'onnx'")
+
+
+PARITY_TEXTS = [
+    "computer science",
+    "calculus",
+    "introduction to machine learning",
+    "organic chemistry lab",
+    "how many credits do I need for a statistics major?",
+    "CSC108H5",
+    "Introduction to Biological Anthropology and Archaeology",
+    "linear regression and generalized linear models",
+]
+
+
+def parity_check(texts: Sequence[str] = PARITY_TEXTS, quantized: bool = True) -> dict:
+    """Cosine agreement and timing of the ONNX encoder against the torch model."""
+    start = time.perf_counter()
+    onnx_encoder = OnnxEncoder(ONNX_DIR, quantized=quantized)
+    onnx_load = time.perf_counter() - start
+    start = time.perf_counter()
+    torch_encoder = TorchEncoder()
+    torch_load = time.perf_counter() - start
+
+    def timed(encoder):
+        encoder.encode(list(texts), normalize_embeddings=True)        # warm-up
+        start = time.perf_counter()
+        out = encoder.encode(list(texts), normalize_embeddings=True)
+        return out, (time.perf_counter() - start) * 1000
+
+    ref, torch_ms = timed(torch_encoder)
+    got, onnx_ms = timed(onnx_encoder)
+    cosine = np.sum(np.asarray(ref) * got, axis=1)
+    return {
+        "model": str(onnx_encoder.model_path.name),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "torch_load_s": torch_load,
+        "onnx_load_s": onnx_load,
+        "torch_batch_ms": torch_ms,
+        "onnx_batch_ms": onnx_ms,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="ONNX encoder export / parity check")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export_onnx(ONNX_DIR, quantize=not args.no_quantize)
+        return
+    report = parity_check(quantized=not args.no_quantize)
+    for key, value in report.items():
+        print(f"{key:16s} {value:.4f}" if isinstance(value, float) else f"{key:16s} {value}")
+    if report["min_cosine"] < args.min_cosine:
+        raise SystemExit(f"parity check failed: min cosine {report['min_cosine']:.4f} < {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
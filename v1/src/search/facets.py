@@ -0,0 +1,127 @@
+"""
+Facet bitsets for filtered search.
+
+Every facet value (department "CSC", level 300, weight "H") gets a boolean
+mask over the index rows, derived from the course codes once per index
+snapshot.  A filter is the OR of the requested values within a facet and
+the AND across facets; the search channels then only score rows whose bit
+is set, so a filtered query still fills a whole page.
+
+Course codes carry no term/session information, so there is no term facet.
+"""
+import re
+from typing import Collection, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+FACET_CODE_RE = re.compile(r"^([A-Z]{3})(\d)\d{2}([HY])?")
+FACETS = ("department", "level", "weight")
+LEVELS = (100, 200, 300, 400)
+WEIGHTS = ("H", "Y")
+
+# normalized filters: ((facet, (value, ...)), ...) -- hashable, usable as a cache key
+Filters = Tuple[Tuple[str, Tuple], ...]
+
+
+def course_facets(code: str) -> Dict[str, object]:
+    match = FACET_CODE_RE.match(code.upper())
+    if not match:
+        return {}
+    department, digit, weight = match.groups()
+    facets: Dict[str, object] = {"department": department, "level": int(digit) * 100}
+    if weight:
+        facets["weight"] = weight
+    return facets
+
+
+class FacetError(ValueError):
+    """A filter value no course can match; `facet` names the filter."""
+
+    def __init__(self, facet: str, value):
+        super().__init__(f"Invalid {facet} filter {str(value).strip()!r}")
+        self.facet = facet
+        self.value = value
+
+
+def _normalize_value(facet: str, value, departments: Optional[Collection[str]] = None) -> object:
+    text = str(value).strip()
+    if facet == "level":
+        try:
+            level = int(text.lower().replace("-level", "").rstrip("s"))
+        except ValueError:
+            raise FacetError(facet, value) from None
+        level = level * 100 if 1 <= level <= 4 else level    # "3" and "300" both mean 300-level
+        if level not in LEVELS:
+            raise FacetError(facet, value)
+        return level
+    text = text.upper()
+    if facet == "weight" and text not in WEIGHTS:
+        raise FacetError(facet, value)
+    if facet == "department" and (
+        not re.fullmatch(r"[A-Z]{3}", text) or (departments is not None and text not in departments)
+    ):
+        raise FacetError(facet, value)
+    return text
+
+
+def normalize_filters(
+    department: Optional[Iterable] = None,
+    level: Optional[Iterable] = None,
+    weight: Optional[Iterable] = None,
+    departments: Optional[Collection[str]] = None,
+) -> Filters:
+    """
+    Canonical, hashable form of the facet filters; a comma-separated string
+    counts as several values.  Levels are 1-4 or 100-400, weights H or Y and,
+    when `departments` is given, departments must be one of them.  Raises
+    FacetError on any other value.
+    """
+    out: List[Tuple[str, Tuple]] = []
+    for facet, values in (("department", department), ("level", level), ("weight", weight)):
+        if values is None:
+            continue
+        if isinstance(values, (str, int)):
+            values = [values]
+        items = [v for value in values for v in str(value).split(",") if v.strip()]
+        if items:
+            out.append((facet, tuple(sorted({_normalize_value(facet, v, departments) for v in items}))))
+    return tuple(out)
+
+
+def matches(code: str, filters: Filters) -> bool:
+    facets = course_facets(code)
+    return all(facets.get(facet) in values for facet, values in filters)
+
+
+class FacetIndex:
+    """Per-value boolean masks over a list of index row ids."""
+
+    def __init__(self, ids: Sequence[str]):
+        self.n_rows = len(ids)
+        rows: Dict[str, Dict[object, List[int]]] = {facet: {} for facet in FACETS}
+        for i, code in enumerate(ids):
+            for facet, value in course_facets(code).items():
+                rows[facet].setdefault(value, []).append(i)
+        self.bitsets: Mapping[str, Dict[object, np.ndarray]] = {
+            facet: {value: self._mask(r) for value, r in by_value.items()}
+            for facet, by_value in rows.items()
+        }
+
+    def _mask(self, rows: List[int]) -> np.ndarray:
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return mask
+
+    def mask(self, filters: Filters) -> Optional[np.ndarray]:
+        """Rows passing every filter, or None when there is nothing to filter."""
+        if not filters:
+            return None
+        result = np.ones(self.n_rows, dtype=bool)
+        for facet, values in filters:
+            allowed = np.zeros(self.n_rows, dtype=bool)
+            for value in values:
+                bits = self.bitsets[facet].get(value)
+                if bits is not None:
+                    allowed |= bits
+            result &= allowed
+        return result
@@ -0,0 +1,274 @@
+"""
+Typo-tolerant lookup of course codes and title words.
+
+``SymDeleteIndex`` is a symmetric-delete (SymSpell) dictionary: every term
+is stored under each string obtained by deleting up to ``max_distance``
+characters from it.  A query generates its own deletes, looks them up and
+only the few candidates found are verified with an edit distance, so a
+lookup costs tens of microseconds regardless of dictionary size.
+
+``CourseFuzzyIndex`` holds one such dictionary over course codes (and their
+"CSC207" stems) and one over title words, built from the catalog plus the
+courses upserted into the live search index, and rebuilt when either
+changes:
+
+    get_fuzzy_index().match_codes("CSC20H5")    -> ["CSC207H5", "CSC209H5"]
+    get_fuzzy_index().correct_text("calclus")   -> "calculus"
+"""
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from v1.src.catalog import course_code, course_title, get_catalog, normalize_code
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+# "CSC20H5", "CS108", "MATH 135": near enough to a code to try fuzzy code lookup
+CODE_LIKE_RE = re.compile(r"^[A-Z]{2,4}\s*\d[0-9A-Z]{1,5}$", re.I)
+
+
+def allowed_distance(term: str) -> int:
+    """Edits tolerated for a query term of this length."""
+    n = len(term)
+    return 0 if n <= 3 else 1 if n <= 5 else 2
+
+
+def _within_one(a: str, b: str) -> bool:
+    """Linear-time check for distance <= 1 (substitution, indel or adjacent swap)."""
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (
+            i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+        )
+    return a[i:] == b[i + 1:]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance (adjacent swaps cost 1), capped at limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    if limit <= 1:
+        return 1 if limit == 1 and _within_one(a, b) else limit + 1
+    prev_prev: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev_prev[j - 2] + 1)
+            cur[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        prev_prev, prev = prev, cur
+    return min(prev[-1], limit + 1)
+
+
+def deletes(term: str, max_distance: int) -> Set[str]:
+    out = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        frontier = {t[:i] + t[i + 1:] for t in frontier for i in range(len(t))} - out
+        out |= frontier
+    return out
+
+
+class SymDeleteIndex:
+    def __init__(self, terms: Dict[str, int], max_distance: int = 2):
+        self.max_distance = max_distance
+        self.terms = dict(terms)                          # term -> frequency
+        self._deletes: Dict[str, List[str]] = {}
+        for term in self.terms:
+            for variant in deletes(term, max_distance):
+                self._deletes.setdefault(variant, []).append(term)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.terms
+
+    def lookup(
+        self, query: str, max_distance: Optional[int] = None, best_only: bool = False
+    ) -> List[Tuple[str, int]]:
+        """
+        (term, distance) pairs within `max_distance`, closest and most
+        frequent first.  `best_only` stops at the first distance with a hit,
+        which skips the expensive two-edit pass for most typos.
+        """
+        limit = min(self.max_distance, allowed_distance(query) if max_distance is None else max_distance)
+        if query in self.terms and (limit == 0 or best_only):
+            return [(query, 0)]
+        for radius in range(1 if best_only else limit, limit + 1):
+            found: Dict[str, int] = {}
+            for variant in deletes(query, radius):
+                for term in self._deletes.get(variant, ()):
+                    if term not in found:
+                        found[term] = edit_distance(query, term, radius)
+            hits = [(term, d) for term, d in found.items() if d <= radius]
+            if hits:
+                hits.sort(key=lambda hit: (hit[1], -self.terms[hit[0]], hit[0]))
+                return hits
+        return []
+
+
+# title-word correction is deliberately conservative: a word missing from
+# the catalog is often a real word ("nets", "basket"), not a typo
+LONG_WORD = 8               # shorter words are corrected by one edit at most
+CORRECTION_MARGIN = 3       # the best candidate must be this much more frequent than the next
+
+
+def _is_substitution(a: str, b: str) -> bool:
+    """For strings one edit apart: is that edit a replaced letter?"""
+    return len(a) == len(b) and sorted(a) != sorted(b)
+
+
+class _FuzzyLayer:
+    """Code and title-word dictionaries over one set of courses."""
+
+    def __init__(self, courses: Iterable[dict]):
+        code_terms: Dict[str, int] = {}
+        self.codes_of: Dict[str, List[str]] = {}
+        words: Counter = Counter()
+        known: Set[str] = set()
+        for course in courses:
+            code = normalize_code(course_code(course))
+            for term in (code, code[:6]):
+                code_terms[term] = 1
+                self.codes_of.setdefault(term, []).append(code)
+            words.update(WORD_RE.findall(course_title(course).lower()))
+            known.update(WORD_RE.findall((course.get("description") or "").lower()))
+        # codes are short and densely packed ("CSC207" / "CSC209"), so one edit
+        # is already ambiguous; two would mostly return noise
+        self.codes = SymDeleteIndex(code_terms, max_distance=1)
+        self.words = SymDeleteIndex({w: n for w, n in words.items() if len(w) > 2})
+        # words that are never "corrected", even if no title uses them
+        self.known = known | set(words)
+        self.sorted_words = sorted(self.known)
+
+
+class CourseFuzzyIndex:
+    """
+    The catalog layer plus, via ``with_courses``, a small overlay for the
+    courses upserted into the live index; lookups merge the layers.
+    """
+
+    def __init__(self, courses: Iterable[dict] = (), layers: Sequence[_FuzzyLayer] = ()):
+        self._layers: List[_FuzzyLayer] = list(layers) or [_FuzzyLayer(courses)]
+
+    def with_courses(self, courses: Iterable[dict]) -> "CourseFuzzyIndex":
+        """This index plus `courses`; only the new courses are indexed."""
+        return CourseFuzzyIndex(layers=[*self._layers, _FuzzyLayer(courses)])
+
+    def _codes_of(self, term: str) -> List[str]:
+        return [code for layer in self._layers for code in layer.codes_of.get(term, ())]
+
+    def _word_frequency(self, word: str) -> int:
+        return sum(layer.words.terms.get(word, 0) for layer in self._layers)
+
+    def match_codes(self, query: str, limit: int = 5) -> List[str]:
+        """Course codes closest to a (possibly mistyped) code, best distance only."""
+        query = normalize_code(query)
+        if any(query in layer.codes for layer in self._layers):
+            return list(dict.fromkeys(self._codes_of(query)))[:limit]
+        hits = [hit for layer in self._layers for hit in layer.codes.lookup(query, best_only=True)]
+        if not hits:
+            return []
+        best = min(d for _, d in hits)
+        codes = [code for term, d in sorted(hits) if d == best for code in self._codes_of(term)]
+        return list(dict.fromkeys(codes))[:limit]
+
+    def is_word_prefix(self, prefix: str) -> bool:
+        for layer in self._layers:
+            i = bisect_left(layer.sorted_words, prefix)
+            if i < len(layer.sorted_words) and layer.sorted_words[i].startswith(prefix):
+                return True
+        return False
+
+    def correct_word(self, word: str) -> str:
+        """
+        The title word `word` is a typo of, or `word` itself unless the fix
+        is clear: one edit below LONG_WORD letters, a single best candidate
+        at least CORRECTION_MARGIN times as frequent as the runner-up and,
+        for 4-5 letter words, no replaced letter ("nets" is not "news").
+        """
+        if len(word) < 4 or not word.isalpha() or any(word in layer.known for layer in self._layers):
+            return word
+        limit = 1 if len(word) < LONG_WORD else 2
+        found: Dict[str, int] = {}
+        for layer in self._layers:
+            for term, d in layer.words.lookup(word, max_distance=limit, best_only=True):
+                found[term] = min(d, found.get(term, d))
+        if not found:
+            return word
+        best = min(found.values())
+        ranked = sorted(
+            (term for term, d in found.items() if d == best),
+            key=lambda term: (-self._word_frequency(term), term),
+        )
+        top = ranked[0]
+        if len(ranked) > 1 and self._word_frequency(top) < CORRECTION_MARGIN * self._word_frequency(ranked[1]):
+            return word                                 # ambiguous
+        if len(word) <= 5 and (_is_substitution(word, top) or self._word_frequency(top) < 2):
+            return word
+        return top
+
+    def correct_text(self, text: str, last_is_prefix: bool = False) -> str:
+        """
+        Lowercased `text` with clearly misspelled words replaced by the
+        closest title word.  With `last_is_prefix` (autocomplete) a last word
+        that starts some known word is left alone.
+        """
+        tokens = WORD_RE.findall(text.lower())
+        out = [self.correct_word(t) for t in tokens]
+        if last_is_prefix and tokens and self.is_word_prefix(tokens[-1]):
+            out[-1] = tokens[-1]
+        return " ".join(out)
+
+
+_fuzzy: Optional[Tuple[str, CourseFuzzyIndex]] = None
+_live_fuzzy: Optional[Tuple[Tuple[str, str], CourseFuzzyIndex]] = None
+_fuzzy_lock = threading.Lock()
+
+
+def get_fuzzy_index(snapshot: Any = None) -> CourseFuzzyIndex:
+    """
+    The shared fuzzy index over the catalog, built on first use.  Given a
+    live search index snapshot (live_index.py), courses upserted through
+    /search/index are included as an overlay: only those courses are
+    indexed when the snapshot version moves, not the whole catalog.
+    """
+    global _fuzzy, _live_fuzzy
+    catalog = get_catalog()
+    cached = _fuzzy
+    if cached is None or cached[0] != catalog.version:
+        with _fuzzy_lock:
+            cached = _fuzzy
+            if cached is None or cached[0] != catalog.version:
+                cached = _fuzzy = (catalog.version, CourseFuzzyIndex(catalog.courses))
+    index = cached[1]
+    if snapshot is None or not snapshot.payloads:
+        return index
+    key = (catalog.version, snapshot.version)
+    live = _live_fuzzy
+    if live is None or live[0] != key:
+        live = _live_fuzzy = (key, index.with_courses(snapshot.payloads.values()))
+    return live[1]
+
+
+if __name__ == "__main__":
+    fuzzy = get_fuzzy_index()
+    for typo, fixed in [("calclus", "calculus"), ("psycology", "psychology"), ("stastics", "statistics")]:
+        assert fuzzy.correct_word(typo) == fixed, (typo, fuzzy.correct_word(typo))
+    # real words the catalog titles don't use are left alone
+    for word in ("nets", "poker", "basket", "weaving", "cooking", "surfing"):
+        assert fuzzy.correct_word(word) == word, (word, fuzzy.correct_word(word))
+    assert fuzzy.correct_text("neural nets") == "neural nets"
+    print(fuzzy.match_codes("CSC20H5"), fuzzy.correct_text("machne lerning"))
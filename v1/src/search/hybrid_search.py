@@ -1,93 +1,318 @@
-import json, numpy as np, pandas as pd, scipy.sparse as sp, faiss
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
+import atexit
+import os
+import re
+import time
+import numpy as np
 
 from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from v1.src.search.batching import MicroBatcher
+from v1.src.search.cache import LRUCache
+from v1.src.search.encoder import MODEL_ID, load_encoder
+from v1.src.search.facets import Filters
+from v1.src.search.index_store import INDEX_DIR
+from v1.src.search.live_index import LiveSearchIndex
+from v1.src.search.popularity import popularity
+from v1.src.search.postings import grouped_top_k
 
 ROOT_DIR = Path(__file__).resolve().parents[3]
 DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
-data_path = str(DOCUMENTS_DIR / "items.json")                            
-with open(data_path, encoding="utf-8") as f:
-    items = json.load(f)                               
 
-df = pd.DataFrame(items)                               
-dense_mat = np.vstack(df["embedding"]).astype("float32")
+# torch SentenceTransformer or the int8 ONNX export (SEARCH_ENCODER_BACKEND)
+model = load_encoder()
+ENCODER_ID = f"{MODEL_ID}:{model.backend}"
+
+def embed_query_dense(q: str) -> np.ndarray:
+    return embed_queries_dense([q])
 
-# ------- build CSR from the sparse lists -------
-rows, cols, data = [], [], []
-for r, emb in enumerate(df["sparse_embedding"]):
-    rows.extend([r]*len(emb["dimensions"]))
-    cols.extend(emb["dimensions"])
-    data.extend(emb["values"])
 
-vocab_size = max(cols) + 1
-sparse_mat = sp.csr_matrix((data, (rows, cols)), shape=(len(df), vocab_size))
+def normalize_query(q: str) -> str:
+    # MiniLM's tokenizer is uncased, so case and spacing never change the vector
+    return re.sub(r"\s+", " ", q.strip().lower())
 
 
-index_dense = faiss.IndexFlatIP(dense_mat.shape[1])
-index_dense.add(dense_mat)
+# ------- query-embedding cache -------
+# SEARCH_EMBED_CACHE_SIZE entries, each valid for SEARCH_EMBED_CACHE_TTL
+# seconds; set SEARCH_EMBED_CACHE_PATH to keep head queries across restarts.
+embedding_cache = LRUCache(
+    max_size=int(os.getenv("SEARCH_EMBED_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("SEARCH_EMBED_CACHE_TTL", "86400")),
+)
+EMBED_CACHE_PATH: Optional[str] = os.getenv("SEARCH_EMBED_CACHE_PATH")
 
 
+def save_embedding_cache(path: Optional[str] = EMBED_CACHE_PATH) -> None:
+    if not path:
+        return
+    entries = list(embedding_cache.entries())
+    if not entries:
+        return
+    keys, vectors, stored_at = zip(*entries)
+    tmp = f"{path}.tmp.npz"
+    np.savez(
+        tmp,
+        model=np.array(ENCODER_ID),
+        keys=np.array(keys),
+        vectors=np.vstack(vectors),
+        stored_at=np.array(stored_at),
+    )
+    os.replace(tmp, path)
 
-MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"    
-model = SentenceTransformer(MODEL_ID)
 
-def embed_query_dense(q: str) -> np.ndarray:
-    return model.encode([q], normalize_embeddings=True).astype("float32")
+def load_embedding_cache(path: Optional[str] = EMBED_CACHE_PATH) -> None:
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with np.load(path) as saved:
+            if str(saved["model"]) != ENCODER_ID:
+                return                                  # vectors from another encoder
+            for key, vector, stored_at in zip(saved["keys"], saved["vectors"], saved["stored_at"]):
+                embedding_cache.put(str(key), vector, float(stored_at))
+    except Exception as e:
+        print(f"[hybrid_search] ignoring unreadable embedding cache {path}: {e}")
+
+
+load_embedding_cache()
+atexit.register(save_embedding_cache)
+
+
+def _encode_batch(queries: List[str]) -> np.ndarray:
+    return model.encode(queries, normalize_embeddings=True).astype("float32")
+
+
+# Concurrent requests' encodes are coalesced into one forward pass of up to
+# SEARCH_ENCODE_BATCH_SIZE queries.  An idle encoder runs a request at once;
+# only when requests queued up behind a batch does it wait up to
+# SEARCH_ENCODE_MAX_WAIT_MS for more (a wait of 0 disables batching).
+encode_batcher = MicroBatcher(
+    _encode_batch,
+    max_batch_size=int(os.getenv("SEARCH_ENCODE_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("SEARCH_ENCODE_MAX_WAIT_MS", "3")),
+)
+
+
+def encode_queries_dense(queries: List[str]) -> np.ndarray:
+    """Encode queries (no cache), micro-batched with concurrent callers."""
+    return encode_batcher.submit(queries)
+
+
+def embed_queries_dense(queries: List[str]) -> np.ndarray:
+    """
+    Dense query vectors, served from `embedding_cache` where possible; all
+    misses are encoded together in one forward pass.
+    """
+    keys = [normalize_query(q) for q in queries]
+    vectors: List[Optional[np.ndarray]] = [embedding_cache.get(k) for k in keys]
+    missing = list(dict.fromkeys(k for k, v in zip(keys, vectors) if v is None))
+    if missing:
+        encoded = dict(zip(missing, encode_queries_dense(missing)))
+        for key, vector in encoded.items():
+            embedding_cache.put(key, vector)
+        vectors = [encoded[k] if v is None else v for k, v in zip(keys, vectors)]
+    return np.vstack(vectors).astype("float32", copy=False)
 
 
 
 
-vectorizer = TfidfVectorizer().fit(df["name"])
-    
+# ------- index (see index_store.py / live_index.py) -------
+# memory-mapped artifacts plus an in-memory delta for courses changed through
+# the maintenance API; the dense, TF-IDF and BM25 channels all live here
+live_index = LiveSearchIndex(INDEX_DIR, encode=encode_queries_dense)
+
+
+def index_version() -> str:
+    """Version of the index currently being served; changes invalidate caches."""
+    return live_index.version
+
+
 def embed_query_sparse(q: str):
-    return vectorizer.transform([q])                    # 1×Vocab CSR
+    return live_index.snapshot().embed_sparse([q])      # 1×Vocab CSR
 
 
-def hybrid_search(
-    query: str,
+def embed_queries_sparse(queries: List[str]):
+    return live_index.snapshot().embed_sparse(queries)  # n_queries×Vocab CSR
+
+
+RRF_K = 60
+# weight of the popularity prior (0..1 per course, see popularity_prior);
+# about a quarter of a first-place RRF contribution by default
+POPULARITY_WEIGHT = float(os.getenv("SEARCH_POPULARITY_WEIGHT", "0.005"))
+
+# cached /search bodies carry the prior they were ranked with; they are
+# dropped when views arrived within the last SEARCH_POPULARITY_REFRESH_SECONDS
+POPULARITY_REFRESH_SECONDS = float(os.getenv("SEARCH_POPULARITY_REFRESH_SECONDS", "300"))
+
+_prior_cache: Tuple[Any, int, Optional[np.ndarray]] = (None, -1, None)
+_popularity_epoch: Tuple[float, int] = (0.0, 0)
+
+
+def popularity_epoch() -> int:
+    """
+    Course-view counter generation, re-read at most every
+    POPULARITY_REFRESH_SECONDS: a coarse version of the popularity prior
+    for response caches.  Constant while the prior is disabled.
+    """
+    global _popularity_epoch
+    if not POPULARITY_WEIGHT:
+        return 0
+    sampled_at, generation = _popularity_epoch
+    now = time.monotonic()
+    if now - sampled_at >= POPULARITY_REFRESH_SECONDS:
+        generation = popularity.generation("course")
+        _popularity_epoch = (now, generation)
+    return generation
+
+
+def popularity_prior(ids: List[str]) -> Optional[np.ndarray]:
+    """
+    Per-row prior in [0, 1] from the decayed course view counts:
+    log1p(views) relative to the most viewed course.  None while nothing
+    has been viewed.  Cached per index snapshot and counter generation.
+    """
+    global _prior_cache
+    generation = popularity.generation("course")
+    cached_ids, cached_generation, prior = _prior_cache
+    if cached_ids is ids and cached_generation == generation:
+        return prior
+    counts = popularity.counts("course", ids)
+    top = counts.max() if len(counts) else 0.0
+    prior = np.log1p(counts) / np.log1p(top) if top > 0 else None
+    _prior_cache = (ids, generation, prior)
+    return prior
+
+
+def fuse_rankings(
+    channels: List[Tuple[np.ndarray, np.ndarray, float]],
+    use_rrf: bool = True,
+    top_n: int = 10,
+    prior: Optional[np.ndarray] = None,
+) -> List[List[Tuple[int, float]]]:
+    """
+    Fuse per-query rankings from several retrieval channels for a whole
+    batch at once.
+
+    Each channel is ``(ids, scores, weight)`` where ``ids``/``scores`` are
+    (n_queries × k) arrays with rows already sorted best first (id -1 marks
+    padding), so a candidate's rank is simply its column.  Contributions are
+    summed per (query, doc) with one ``np.bincount``; no per-candidate Python
+    work is done.
+
+    `prior` (one weighted score per index row) is added once to every
+    candidate, however many channels found it.
+
+    Without RRF each channel's scores are divided by the query's best score
+    in that channel first: BM25 scores are unbounded (5-10 is typical)
+    while cosine and TF-IDF stay in [0, 1], so raw sums would let BM25
+    decide the ranking whatever the weights.
+    """
+    n_queries = channels[0][0].shape[0]
+    rows, docs, contribs = [], [], []
+    for ids, scores, weight in channels:
+        valid = ids >= 0                                 # padding from ANN / BM25
+        if use_rrf:                                      # Reciprocal Rank Fusion
+            contrib = np.broadcast_to(weight / (RRF_K + np.arange(ids.shape[1])), ids.shape)
+        else:                                           # weighted sum of max-normalized scores
+            best = np.where(valid, scores, 0.0).max(axis=1, keepdims=True)
+            contrib = weight * scores / np.where(best > 0, best, 1.0)
+        rows.append(np.nonzero(valid)[0])
+        docs.append(ids[valid])
+        contribs.append(contrib[valid])
+
+    if prior is not None:
+        candidates = np.unique(np.concatenate(rows) * len(prior) + np.concatenate(docs))
+        docs.append(candidates % len(prior))
+        rows.append(candidates // len(prior))
+        contribs.append(prior[docs[-1]])
+
+    fused_ids, fused_scores = grouped_top_k(
+        np.concatenate(rows), np.concatenate(docs), np.concatenate(contribs), n_queries, top_n
+    )
+    return [
+        [(doc, score) for doc, score in zip(ids_row, scores_row) if doc >= 0]
+        for ids_row, scores_row in zip(fused_ids.tolist(), fused_scores.tolist())
+    ]
+
+
+def hybrid_search_many(
+    queries: List[str],
     top_k_dense=20,
     top_k_sparse=20,
     w_dense=0.6,
     w_sparse=0.4,
     use_rrf=True,
-):
+    top_n=10,
+    top_k_bm25=20,
+    w_bm25=0.5,
+    facets: Filters = (),
+    w_popularity=POPULARITY_WEIGHT,
+    sparse_queries: Optional[List[str]] = None,
+) -> List[List[Tuple[Any, float]]]:
+    """
+    Run `hybrid_search` for many queries with one encoder call, one dense
+    search and one postings gather per sparse channel for the whole batch.
+
+    `facets` (see facets.normalize_filters) restricts every channel to the
+    matching courses before scoring.  `w_popularity` scales a prior from
+    recent course views (popularity.py) added to every fused candidate.
+    `sparse_queries` (e.g. spell-corrected) replace `queries` in the TF-IDF
+    and BM25 channels only; the encoder always sees the text as typed.
+    """
+    if not queries:
+        return []
+    # one snapshot for the whole batch, so a concurrent index update is
+    # either fully visible or not at all
+    index = live_index.snapshot()
+    mask = index.facet_mask(facets)
+    if mask is not None and not mask.any():
+        return [[] for _ in queries]
+
     # -------- dense scores --------
-    qd = embed_query_dense(query)
-    
-    D, I = index_dense.search(qd, top_k_dense)
-    dense_scores = {int(i): float(s) for i, s in zip(I[0], D[0])}
+    qd = embed_queries_dense(queries)
+    dense_ids, dense_scores = index.search_dense(qd, top_k_dense, mask)
 
     # -------- sparse scores --------
-    qs = embed_query_sparse(query)
-    sp_scores = (qs @ sparse_mat.T).toarray().ravel()
-    top_sparse = sp_scores.argsort()[-top_k_sparse:][::-1]
-    sparse_scores = {int(i): float(sp_scores[i]) for i in top_sparse}
+    # only postings of the query terms are touched; docs sharing no term
+    # with the query get no score instead of a zero in a dense vector
+    if sparse_queries is None:
+        sparse_queries = queries
+    qs = index.embed_sparse(sparse_queries)
+    sparse_ids, sparse_scores = index.search_sparse(qs, top_k_sparse, mask)
+
+    channels = [(dense_ids, dense_scores, w_dense), (sparse_ids, sparse_scores, w_sparse)]
+
+    # -------- BM25 full-text scores --------
+    if index.bm25 is not None and w_bm25:
+        bm25_ids, bm25_scores = index.search_bm25(sparse_queries, top_k_bm25, mask)
+        channels.append((bm25_ids, bm25_scores, w_bm25))
 
     # -------- fusion --------
-    if use_rrf:                                          # Reciprocal Rank Fusion
-        def rrf(rank): return 1 / (60 + rank)
-        all_ids = set(dense_scores) | set(sparse_scores)
-        fused = [
-            (
-                i,
-                rrf(list(dense_scores).index(i)) * w_dense
-                + rrf(list(sparse_scores).index(i)) * w_sparse
-                if i in dense_scores and i in sparse_scores
-                else rrf(list(dense_scores).index(i)) * w_dense
-                if i in dense_scores
-                else rrf(list(sparse_scores).index(i)) * w_sparse
-            )
-            for i in all_ids
-        ]
-    else:                                               # simple weighted sum
-        all_ids = set(dense_scores) | set(sparse_scores)
-        fused = [
-            (i, w_dense * dense_scores.get(i, 0) + w_sparse * sparse_scores.get(i, 0))
-            for i in all_ids
-        ]
-
-    fused.sort(key=lambda x: x[1], reverse=True)
-    return [(df.iloc[i]["id"], score) for i, score in fused[:10]]
-for cid, score in hybrid_search("data science"):
-    print(f"{score:0.3f}", cid)
\ No newline at end of file
+    prior = popularity_prior(index.ids) if w_popularity else None
+    fused = fuse_rankings(channels, use_rrf, top_n, None if prior is None else w_popularity * prior)
+    return [[(index.ids[i], score) for i, score in hits] for hits in fused]
+
+
+def hybrid_search(
+    query: str,
+    top_k_dense=20,
+    top_k_sparse=20,
+    w_dense=0.6,
+    w_sparse=0.4,
+    use_rrf=True,
+    top_n=10,
+    top_k_bm25=20,
+    w_bm25=0.5,
+    facets: Filters = (),
+    w_popularity=POPULARITY_WEIGHT,
+    sparse_query: Optional[str] = None,
+):
+    return hybrid_search_many(
+        [query], top_k_dense, top_k_sparse, w_dense, w_sparse, use_rrf, top_n,
+        top_k_bm25, w_bm25, facets, w_popularity,
+        None if sparse_query is None else [sparse_query],
+    )[0]
+
+
+if __name__ == "__main__":
+    for cid, score in hybrid_search("data science"):
+        print(f"{score:0.3f}", cid)
@@ -0,0 +1,188 @@
+"""
+Binary on-disk form of the hybrid search index.
+
+The build step writes the dense embedding matrix and the CSR arrays of the
+sparse matrix as plain `.npy` files plus a small JSON id table, so the search
+module can `np.load(..., mmap_mode="r")` them instead of parsing items.json.
+Every uvicorn worker maps the same files, so the pages are shared.
+
+Layout of ``v1/files/search_index/``::
+
+    dense.npy            float32 (n_docs × dim), L2-normalised rows
+    sparse_data.npy      float32 CSR values
+    sparse_indices.npy   int32   CSR column ids
+    sparse_indptr.npy    int64   CSR row pointers
+    postings_*.npy       the same matrix in term-major (CSC) posting form
+    ids.json             {"ids": [...], "names": [...]}
+    manifest.json        shapes + content version, written last
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import scipy.sparse as sp
+
+from v1.src.search.postings import PostingsIndex
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
+INDEX_DIR = DOCUMENTS_DIR / "search_index"
+ITEMS_PATH = DOCUMENTS_DIR / "items.json"
+
+DENSE_FILE = "dense.npy"
+SPARSE_DATA_FILE = "sparse_data.npy"
+SPARSE_INDICES_FILE = "sparse_indices.npy"
+SPARSE_INDPTR_FILE = "sparse_indptr.npy"
+POSTINGS_DATA_FILE = "postings_data.npy"
+POSTINGS_INDICES_FILE = "postings_indices.npy"
+POSTINGS_INDPTR_FILE = "postings_indptr.npy"
+IDS_FILE = "ids.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def _save_npy(path: Path, arr: np.ndarray) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def _save_json(path: Path, obj: Any) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def write_index(
+    ids: List[str],
+    names: List[str],
+    dense: np.ndarray,
+    sparse: sp.csr_matrix,
+    index_dir: Path = INDEX_DIR,
+) -> str:
+    """Write the index artifacts and return their content version."""
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    dense = np.ascontiguousarray(dense, dtype=np.float32)
+    sparse = sp.csr_matrix(sparse, dtype=np.float32)
+    sparse.sort_indices()
+    postings = PostingsIndex.from_doc_term(sparse)
+    arrays = {
+        DENSE_FILE: dense,
+        SPARSE_DATA_FILE: sparse.data.astype(np.float32),
+        SPARSE_INDICES_FILE: sparse.indices.astype(np.int32),
+        SPARSE_INDPTR_FILE: sparse.indptr.astype(np.int64),
+        POSTINGS_DATA_FILE: postings.data,
+        POSTINGS_INDICES_FILE: postings.indices,
+        POSTINGS_INDPTR_FILE: postings.indptr,
+    }
+
+    digest = hashlib.sha256()
+    for name, arr in arrays.items():
+        digest.update(name.encode())
+        digest.update(arr.tobytes())
+        _save_npy(index_dir / name, arr)
+    id_table = {"ids": list(ids), "names": list(names)}
+    digest.update(json.dumps(id_table, ensure_ascii=False).encode())
+    _save_json(index_dir / IDS_FILE, id_table)
+
+    version = digest.hexdigest()[:16]
+    # manifest goes last so a reader never sees a half-written index
+    _save_json(
+        index_dir / MANIFEST_FILE,
+        {
+            "version": version,
+            "n_docs": int(dense.shape[0]),
+            "dim": int(dense.shape[1]),
+            "vocab_size": int(sparse.shape[1]),
+        },
+    )
+    print(f"[index_store] wrote {dense.shape[0]} docs to {index_dir} (version {version})")
+    return version
+
+
+def build_from_items(items_path: Path = ITEMS_PATH, index_dir: Path = INDEX_DIR) -> str:
+    """Convert a legacy items.json into the binary artifacts."""
+    with open(items_path, encoding="utf-8") as f:
+        items = json.load(f)
+
+    dense = np.asarray([it["embedding"] for it in items], dtype=np.float32)
+    lengths = [len(it["sparse_embedding"]["dimensions"]) for it in items]
+    indptr = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    indices = np.fromiter(
+        (d for it in items for d in it["sparse_embedding"]["dimensions"]),
+        dtype=np.int32, count=int(indptr[-1]),
+    )
+    data = np.fromiter(
+        (v for it in items for v in it["sparse_embedding"]["values"]),
+        dtype=np.float32, count=int(indptr[-1]),
+    )
+    vocab_size = int(indices.max()) + 1 if len(indices) else 0
+    sparse = sp.csr_matrix((data, indices, indptr), shape=(len(items), vocab_size))
+
+    return write_index(
+        [it["id"] for it in items], [it["name"] for it in items], dense, sparse, index_dir
+    )
+
+
+class IndexArtifacts:
+    """Memory-mapped view of a written index."""
+
+    def __init__(self, index_dir: Path = INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        with open(self.index_dir / MANIFEST_FILE, encoding="utf-8") as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        self.version: str = self.manifest["version"]
+
+        self.dense: np.ndarray = np.load(self.index_dir / DENSE_FILE, mmap_mode="r")
+        self.sparse = sp.csr_matrix(
+            (
+                np.load(self.index_dir / SPARSE_DATA_FILE, mmap_mode="r"),
+                np.load(self.index_dir / SPARSE_INDICES_FILE, mmap_mode="r"),
+                np.load(self.index_dir / SPARSE_INDPTR_FILE, mmap_mode="r"),
+            ),
+            shape=(self.manifest["n_docs"], self.manifest["vocab_size"]),
+            copy=False,
+        )
+        if (self.index_dir / POSTINGS_INDPTR_FILE).exists():
+            self.postings = PostingsIndex(
+                np.load(self.index_dir / POSTINGS_INDPTR_FILE, mmap_mode="r"),
+                np.load(self.index_dir / POSTINGS_INDICES_FILE, mmap_mode="r"),
+                np.load(self.index_dir / POSTINGS_DATA_FILE, mmap_mode="r"),
+            )
+        else:                                            # artifacts from before postings
+            self.postings = PostingsIndex.from_doc_term(self.sparse)
+        with open(self.index_dir / IDS_FILE, encoding="utf-8") as f:
+            id_table = json.load(f)
+        self.ids: List[str] = id_table["ids"]
+        self.names: List[str] = id_table["names"]
+        self.row_of: Dict[str, int] = {code: i for i, code in enumerate(self.ids)}
+
+
+def index_exists(index_dir: Path = INDEX_DIR) -> bool:
+    return (Path(index_dir) / MANIFEST_FILE).exists()
+
+
+def load_index(index_dir: Path = INDEX_DIR, items_path: Optional[Path] = ITEMS_PATH) -> IndexArtifacts:
+    """
+    Map the binary index, converting items.json once if the artifacts have
+    not been built yet.
+    """
+    if not index_exists(index_dir):
+        if items_path is None or not Path(items_path).exists():
+            raise FileNotFoundError(
+                f"No search index at {index_dir}; run `python -m v1.src.search.index_store` "
+                "or v1/src/search/inputData.py first"
+            )
+        print(f"[index_store] building binary index from {items_path}")
+        build_from_items(items_path, index_dir)
+    return IndexArtifacts(index_dir)
+
+
+if __name__ == "__main__":
+    build_from_items()
@@ -3,21 +3,27 @@ from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint impo
 )
 from sklearn.feature_extraction.text import TfidfVectorizer
 import pandas as pd
+import numpy as np
 import json
 from google.cloud import storage
 import sys
 from pathlib import Path
 from datetime import datetime
 # from vertexai.preview.language_models import TextEmbeddingModel
-from sentence_transformers import SentenceTransformer
 EMBED_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"  # or BGE
-model = SentenceTransformer(EMBED_MODEL_ID) 
 UID = datetime.now().strftime("%m%d%H%M")
 
 PROJECT_ID = "hybrid-search"
 
 
 ROOT_DIR = Path(__file__).resolve().parents[3]
+sys.path.append(str(ROOT_DIR))
+from v1.src.search.index_store import INDEX_DIR, write_index
+from v1.src.search.encoder import load_encoder
+
+# torch SentenceTransformer or the int8 ONNX export (SEARCH_ENCODER_BACKEND);
+# build the index with the same backend the server will query with
+model = load_encoder()
 
 DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
 data_path = str(DOCUMENTS_DIR / "courses.json") 
@@ -139,4 +145,13 @@ with open(output, "w", encoding="utf-8") as f:
 
 output_path = Path(DOCUMENTS_DIR) / "items.json"
 
+# binary, memory-mappable artifacts read by hybrid_search.py
+write_index(
+    [it["id"] for it in items],
+    [it["name"] for it in items],
+    np.asarray([it["embedding"] for it in items], dtype=np.float32),
+    vectorizer.transform(names_only),
+    INDEX_DIR,
+)
+
 # upload_blob(BUCKET_NAME,output_path, "items.json")
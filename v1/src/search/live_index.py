@@ -0,0 +1,381 @@
+"""
+Updatable view of the hybrid search index.
+
+The artifacts written by index_store.py are immutable and memory-mapped, so
+course changes made while the server runs go into a small in-memory delta
+segment instead:
+
+* an upsert appends the course's dense and TF-IDF vectors as a new delta row
+  and tombstones the row it replaces;
+* a delete only tombstones.
+
+Searches run the base index as before, over-fetching by the number of
+tombstoned base rows, score the delta exactly and merge the two.  The
+BM25 channel keeps its prebuilt passages; they are re-pointed at a course's
+new row on update and dropped on delete.
+
+Compaction folds base + delta into a fresh set of artifacts (tombstoned rows
+removed, TF-IDF vocabulary refitted), maps them and resets the delta.  It
+runs on request and in the background once ``SEARCH_COMPACT_AFTER`` changes
+(default 200) have piled up.  Payloads of upserted courses and deleted codes
+are written to ``overrides.json`` with the artifacts, so they survive
+restarts; changes not yet compacted do not.
+
+Every change publishes a new ``IndexSnapshot``; a search takes one snapshot
+and never sees a half-applied change.  Changes are local to the process:
+with several workers, send them to each or compact and restart the rest.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from v1.src.catalog import normalize_code
+from v1.src.search.bm25 import load_bm25
+from v1.src.search.dense_index import load_dense_index, top_k_rows
+from v1.src.search.facets import FacetIndex, Filters
+from v1.src.search.index_store import INDEX_DIR, IndexArtifacts, _save_json, load_index, write_index
+
+OVERRIDES_FILE = "overrides.json"
+
+
+def live_top_k(
+    ids: np.ndarray, scores: np.ndarray, alive: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Best ``k`` candidates per row that are not padding (-1) or tombstoned.
+    Returns (ids, scores) of shape (n_rows × k), best first, -1 padded.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    scores = np.asarray(scores, dtype=np.float64)
+    valid = ids >= 0
+    valid[valid] = alive[ids[valid]]
+    masked = np.where(valid, scores, -np.inf)
+    order = np.argsort(-masked, axis=1, kind="stable")[:, :k]
+    top_ids = np.take_along_axis(ids, order, axis=1)
+    top_scores = np.take_along_axis(masked, order, axis=1)
+    missing = np.isneginf(top_scores)
+    top_ids[missing] = -1
+    top_scores[missing] = 0.0
+    return top_ids, top_scores
+
+
+class IndexSnapshot:
+    """
+    One immutable state of the live index.  Rows ``0..n_base-1`` are the
+    mapped artifacts, the rest the delta segment.
+    """
+
+    def __init__(
+        self,
+        base: IndexArtifacts,
+        vectorizer: TfidfVectorizer,
+        dense_index: Any,
+        bm25: Any,
+        ids: List[str],
+        names: List[str],
+        alive: np.ndarray,
+        delta_dense: np.ndarray,
+        delta_sparse: sp.csr_matrix,
+        base_remap: np.ndarray,
+        payloads: Dict[str, Dict[str, Any]],
+        deleted: Set[str],
+        changes: int,
+    ):
+        self.base = base
+        self.vectorizer = vectorizer
+        self.dense_index = dense_index
+        self.bm25 = bm25
+        self.ids = ids
+        self.names = names
+        self.alive = alive
+        self.delta_dense = delta_dense
+        self.delta_sparse = delta_sparse
+        self.base_remap = base_remap          # base row -> live row (or -1)
+        self.payloads = payloads
+        self.deleted = deleted
+        self.changes = changes
+
+        self.n_base = base.dense.shape[0]
+        self.dead_base = int(self.n_base - np.count_nonzero(alive[: self.n_base]))
+        self.version = base.version if not changes else f"{base.version}+{changes}"
+        self.row_of = {code: i for i, code in enumerate(ids) if alive[i]}
+        self._facets: Optional[FacetIndex] = None
+        self.passage_doc = None
+        if bm25 is not None:
+            base_doc = bm25.passage_doc
+            self.passage_doc = np.where(base_doc >= 0, base_remap[base_doc], -1)
+
+    @property
+    def n_delta(self) -> int:
+        return self.delta_dense.shape[0]
+
+    @property
+    def n_live(self) -> int:
+        return len(self.row_of)
+
+    def payload(self, code: str) -> Optional[Dict[str, Any]]:
+        """Search payload of a course upserted through the live index."""
+        return self.payloads.get(normalize_code(code))
+
+    def is_deleted(self, code: str) -> bool:
+        return normalize_code(code) in self.deleted
+
+    @property
+    def facets(self) -> FacetIndex:
+        if self._facets is None:                        # built on first filtered search
+            self._facets = FacetIndex(self.ids)
+        return self._facets
+
+    def facet_mask(self, filters: Filters) -> Optional[np.ndarray]:
+        """Live rows passing `filters`, or None for an unfiltered search."""
+        mask = self.facets.mask(filters)
+        return None if mask is None else mask & self.alive
+
+    def embed_sparse(self, queries: Sequence[str]) -> sp.csr_matrix:
+        return self.vectorizer.transform(queries)        # n_queries×Vocab CSR
+
+    def search_dense(
+        self, qd: np.ndarray, k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (ids, scores) of the top k live rows per query vector.  With a facet
+        `mask` only the selected rows are scored, exactly.
+        """
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                return np.full((len(qd), 0), -1, dtype=np.int64), np.zeros((len(qd), 0))
+            in_base = rows[rows < self.n_base]
+            vectors = np.asarray(self.base.dense[in_base])
+            if len(in_base) < len(rows):
+                vectors = np.vstack([vectors, self.delta_dense[rows[len(in_base):] - self.n_base]])
+            ids, scores = top_k_rows(qd @ vectors.T, k)
+            return rows[ids], scores
+        k_base = min(k + self.dead_base, self.n_base)
+        scores, ids = self.dense_index.search(qd, k_base)
+        if not self.changes:
+            return ids, scores
+        if self.n_delta:
+            delta_scores = qd @ self.delta_dense.T
+            delta_ids = np.broadcast_to(self.n_base + np.arange(self.n_delta), delta_scores.shape)
+            ids = np.hstack([ids, delta_ids])
+            scores = np.hstack([scores, delta_scores])
+        return live_top_k(ids, scores, self.alive, k)
+
+    def search_sparse(
+        self, qs: sp.csr_matrix, k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (ids, scores) of the top k live rows sharing a term with each query.
+        Postings of rows outside a facet `mask` are dropped before ranking.
+        """
+        if mask is None:
+            ids, scores = self.base.postings.search_many(qs, k + self.dead_base)
+            if not self.changes:
+                return ids[:, :k], scores[:, :k]
+            keep = self.alive
+        else:
+            base_map = np.where(mask[: self.n_base], np.arange(self.n_base), -1)
+            ids, scores = self.base.postings.search_many(qs, k, doc_map=base_map)
+            keep = mask
+        if self.n_delta:
+            delta_scores = (qs @ self.delta_sparse.T).toarray()
+            delta_ids = np.where(delta_scores > 0, self.n_base + np.arange(self.n_delta), -1)
+            ids = np.hstack([ids, delta_ids])
+            scores = np.hstack([scores, delta_scores])
+        return live_top_k(ids, scores, keep, k)
+
+    def search_bm25(
+        self, queries: Sequence[str], k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        doc_map = self.passage_doc
+        if mask is not None:
+            doc_map = np.where((doc_map >= 0) & mask[np.maximum(doc_map, 0)], doc_map, -1)
+        return self.bm25.search_many(queries, k, doc_map=doc_map)
+
+
+class LiveSearchIndex:
+    """Owns the current snapshot and applies upserts, deletes and compactions."""
+
+    def __init__(
+        self,
+        index_dir: Path = INDEX_DIR,
+        encode: Optional[Callable[[List[str]], np.ndarray]] = None,
+        compact_after: Optional[int] = None,
+    ):
+        self.index_dir = Path(index_dir)
+        self.encode = encode
+        self.compact_after = (
+            int(os.getenv("SEARCH_COMPACT_AFTER", "200")) if compact_after is None else compact_after
+        )
+        self._lock = threading.Lock()           # serializes writers; readers never block
+        self._compacting = False
+        self.compactions = 0
+        self._snapshot = self._open()
+
+    def snapshot(self) -> IndexSnapshot:
+        return self._snapshot
+
+    @property
+    def version(self) -> str:
+        return self._snapshot.version
+
+    def _open(self) -> IndexSnapshot:
+        base = load_index(self.index_dir)
+        overrides: Dict[str, Any] = {}
+        if (self.index_dir / OVERRIDES_FILE).exists():
+            with open(self.index_dir / OVERRIDES_FILE, encoding="utf-8") as f:
+                overrides = json.load(f)
+        n = base.dense.shape[0]
+        return IndexSnapshot(
+            base=base,
+            vectorizer=TfidfVectorizer().fit(base.names),
+            # flat (exact, over the mapped matrix), hnsw or ivf; see dense_index.py
+            dense_index=load_dense_index(base.dense, self.index_dir, base.version),
+            # full-text BM25 over course_data.txt passages, mapped back to doc rows
+            bm25=load_bm25(base.ids),
+            ids=list(base.ids),
+            names=list(base.names),
+            alive=np.ones(n, dtype=bool),
+            delta_dense=np.zeros((0, base.dense.shape[1]), dtype=np.float32),
+            delta_sparse=sp.csr_matrix((0, base.sparse.shape[1]), dtype=np.float32),
+            base_remap=np.arange(n, dtype=np.int64),
+            payloads=overrides.get("payloads", {}),
+            deleted=set(overrides.get("deleted", [])),
+            changes=0,
+        )
+
+    def _publish(self, snap: IndexSnapshot, **fields: Any) -> IndexSnapshot:
+        state = {
+            name: getattr(snap, name)
+            for name in (
+                "base", "vectorizer", "dense_index", "bm25", "ids", "names", "alive",
+                "delta_dense", "delta_sparse", "base_remap", "payloads", "deleted",
+            )
+        }
+        state.update(fields)
+        self._snapshot = IndexSnapshot(changes=snap.changes + 1, **state)
+        return self._snapshot
+
+    def upsert(self, code: str, name: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Add or replace a course.  ``name`` is the text that is embedded (the
+        human-readable title, like the build step); ``payload`` is what
+        /search returns for it.
+        """
+        if self.encode is None:
+            raise RuntimeError("LiveSearchIndex was created without an encoder")
+        code = normalize_code(code)
+        vector = np.asarray(self.encode([name]), dtype=np.float32).reshape(1, -1)
+
+        with self._lock:
+            snap = self._snapshot
+            new_row = len(snap.ids)
+            old_row = snap.row_of.get(code)
+            alive = np.append(snap.alive, True)
+            if old_row is not None:
+                alive[old_row] = False
+            base_remap = snap.base_remap
+            base_row = snap.base.row_of.get(code)
+            if base_row is not None:
+                base_remap = base_remap.copy()
+                base_remap[base_row] = new_row
+            payloads = dict(snap.payloads)
+            if payload is not None:
+                payloads[code] = payload
+            snap = self._publish(
+                snap,
+                ids=snap.ids + [code],
+                names=snap.names + [name],
+                alive=alive,
+                delta_dense=np.vstack([snap.delta_dense, vector]),
+                delta_sparse=sp.vstack(
+                    [snap.delta_sparse, snap.vectorizer.transform([name]).astype(np.float32)], format="csr"
+                ),
+                base_remap=base_remap,
+                payloads=payloads,
+                deleted=snap.deleted - {code},
+            )
+        self._maybe_compact()
+        return {"course": code, "replaced": old_row is not None, "version": snap.version}
+
+    def delete(self, code: str) -> bool:
+        """Tombstone a course; False if it is not in the index."""
+        code = normalize_code(code)
+        with self._lock:
+            snap = self._snapshot
+            row = snap.row_of.get(code)
+            if row is None:
+                return False
+            alive = snap.alive.copy()
+            alive[row] = False
+            base_remap = snap.base_remap
+            if code in snap.base.row_of:
+                base_remap = base_remap.copy()
+                base_remap[snap.base.row_of[code]] = -1
+            payloads = {c: p for c, p in snap.payloads.items() if c != code}
+            self._publish(
+                snap, alive=alive, base_remap=base_remap, payloads=payloads,
+                deleted=snap.deleted | {code},
+            )
+        self._maybe_compact()
+        return True
+
+    def compact(self) -> Dict[str, Any]:
+        """Rewrite the artifacts without tombstones and fold the delta in."""
+        with self._lock:
+            snap = self._snapshot
+            if snap.changes:
+                rows = np.flatnonzero(snap.alive)
+                base_rows, delta_rows = rows[rows < snap.n_base], rows[rows >= snap.n_base]
+                ids = [snap.ids[r] for r in rows]
+                names = [snap.names[r] for r in rows]
+                dense = np.vstack(
+                    [np.asarray(snap.base.dense[base_rows]), snap.delta_dense[delta_rows - snap.n_base]]
+                )
+                vectorizer = TfidfVectorizer().fit(names)
+                write_index(ids, names, dense, vectorizer.transform(names), self.index_dir)
+                _save_json(
+                    self.index_dir / OVERRIDES_FILE,
+                    {"payloads": snap.payloads, "deleted": sorted(snap.deleted)},
+                )
+                self._snapshot = self._open()
+                self.compactions += 1
+                print(f"[live_index] compacted {snap.changes} changes into {len(ids)} docs")
+            return self.stats()
+
+    def _maybe_compact(self) -> None:
+        with self._lock:
+            if self.compact_after <= 0 or self._snapshot.changes < self.compact_after or self._compacting:
+                return
+            self._compacting = True
+
+        def run():
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"[live_index] background compaction failed: {e}")
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=run, name="index-compaction", daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        return {
+            "version": snap.version,
+            "base_docs": snap.n_base,
+            "delta_docs": snap.n_delta,
+            "live_docs": snap.n_live,
+            "tombstones": len(snap.ids) - snap.n_live,
+            "pending_changes": snap.changes,
+            "compact_after": self.compact_after,
+            "compacting": self._compacting,
+            "compactions": self.compactions,
+        }
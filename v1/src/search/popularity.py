@@ -0,0 +1,246 @@
+"""
+Query/click log with exponentially decayed popularity counters.
+
+/course/{id} views, /search queries and /suggestions prefixes are recorded
+with ``popularity.record``: the request thread only appends a tuple to a
+deque.  A background thread folds the buffered events into the counters
+every POPULARITY_APPLY_SECONDS and writes them to POPULARITY_PATH every
+POPULARITY_FLUSH_SECONDS (and at exit).  Course views feed the /search
+prior (hybrid_search.popularity_prior); all three kinds feed /suggestions
+ranking (autocomplete.display_demand).
+
+Counts decay with a half-life of POPULARITY_HALF_LIFE_DAYS using forward
+decay: an event at time t adds ``w * 2**((t - landmark) / half_life)``, so
+stored values never need touching as time passes; the current count is the
+stored value times ``2**(-(now - landmark) / half_life)``.  The landmark is
+moved forward (rescaling everything once) before the weights could overflow.
+
+Each counter is one float64 array plus a key -> slot dict.  With several
+workers each keeps its own counters and the last one to flush wins; give
+them separate POPULARITY_PATHs to keep every log.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[3]
+DOCUMENTS_DIR = ROOT_DIR / "v1" / "files"
+POPULARITY_PATH: Optional[str] = os.getenv("POPULARITY_PATH", str(DOCUMENTS_DIR / "popularity.npz"))
+
+KINDS = ("course", "query", "prefix")
+# landmark is moved once stored weights grow by 2**RESCALE_AFTER
+RESCALE_AFTER = 32
+
+
+class DecayedCounter:
+    def __init__(self, half_life: float, max_keys: int = 100_000, landmark: Optional[float] = None):
+        self.half_life = half_life
+        self.max_keys = max_keys
+        self.landmark = time.time() if landmark is None else landmark
+        self.slots: Dict[str, int] = {}
+        self.keys: List[str] = []
+        self.values = np.zeros(1024, dtype=np.float64)
+        # bumped on every change, so derived arrays can be cached
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _slot(self, key: str) -> int:
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = len(self.keys)
+            if slot == len(self.values):
+                self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+            self.slots[key] = slot
+            self.keys.append(key)
+        return slot
+
+    def _scale(self, now: float) -> float:
+        return float(np.exp2(-(now - self.landmark) / self.half_life))
+
+    def add_many(self, events: Sequence[Tuple[str, float, float]]) -> None:
+        """Add (key, weight, timestamp) events."""
+        if not events:
+            return
+        with self._lock:
+            newest = max(t for _, _, t in events)
+            if (newest - self.landmark) / self.half_life > RESCALE_AFTER:
+                self.values *= self._scale(newest)
+                self.landmark = newest
+            slots = np.array([self._slot(key) for key, _, _ in events], dtype=np.int64)
+            weights = np.array([w for _, w, _ in events], dtype=np.float64)
+            stamps = np.array([t for _, _, t in events], dtype=np.float64)
+            np.add.at(self.values, slots, weights * np.exp2((stamps - self.landmark) / self.half_life))
+            if len(self.keys) > self.max_keys:
+                self._prune(self.max_keys // 2)
+            self.generation += 1
+
+    def _prune(self, keep: int) -> None:
+        """Keep only the `keep` largest counts (bounds the query/prefix logs)."""
+        order = np.argsort(-self.values[:len(self.keys)], kind="stable")[:keep]
+        self.keys = [self.keys[i] for i in order.tolist()]
+        self.slots = {key: slot for slot, key in enumerate(self.keys)}
+        values = np.zeros(max(1024, 2 * keep), dtype=np.float64)
+        values[:keep] = self.values[order]
+        self.values = values
+
+    def counts(self, keys: Sequence[str], now: Optional[float] = None) -> np.ndarray:
+        """Current decayed counts of `keys`, 0 for keys never seen."""
+        with self._lock:
+            slots = np.array([self.slots.get(key, -1) for key in keys], dtype=np.int64)
+            out = np.where(slots >= 0, self.values[np.maximum(slots, 0)], 0.0)
+            return out * self._scale(time.time() if now is None else now)
+
+    def top(self, n: int = 10) -> List[Tuple[str, float]]:
+        with self._lock:
+            values = self.values[:len(self.keys)] * self._scale(time.time())
+            order = np.argsort(-values, kind="stable")[:n]
+            return [(self.keys[i], round(float(values[i]), 3)) for i in order.tolist()]
+
+    def state(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            return {
+                "keys": np.array(self.keys, dtype=str),
+                "values": self.values[:len(self.keys)].copy(),
+                "landmark": np.array(self.landmark),
+            }
+
+    def restore(self, keys: Sequence[str], values: np.ndarray, landmark: float) -> None:
+        with self._lock:
+            self.keys = [str(key) for key in keys]
+            self.slots = {key: slot for slot, key in enumerate(self.keys)}
+            self.values = np.zeros(max(1024, 2 * len(self.keys)), dtype=np.float64)
+            self.values[:len(self.keys)] = values
+            self.landmark = float(landmark)
+            self.generation += 1
+
+
+class PopularityLog:
+    def __init__(
+        self,
+        path: Optional[str] = POPULARITY_PATH,
+        half_life_days: float = 7.0,
+        apply_seconds: float = 1.0,
+        flush_seconds: float = 60.0,
+        max_keys: int = 100_000,
+        max_pending: int = 100_000,
+    ):
+        self.path = path
+        self.apply_seconds = apply_seconds
+        self.flush_seconds = flush_seconds
+        self.counters = {kind: DecayedCounter(half_life_days * 86400, max_keys) for kind in KINDS}
+        # bounded, so a stalled worker costs dropped events rather than memory
+        self._pending: Deque[Tuple[str, str, float, float]] = deque(maxlen=max_pending)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.time()
+        self.recorded = 0
+        self.applied = 0
+        self.flushes = 0
+        self._flushed_applied = 0
+        self.load()
+
+    def record(self, kind: str, key: str, weight: float = 1.0) -> None:
+        """Log one event; O(1), no locks on the request path."""
+        self._pending.append((kind, key, weight, time.time()))
+        self.recorded += 1
+        if self._thread is None:
+            self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="popularity-log", daemon=True)
+                    self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.apply_seconds)
+            try:
+                self.apply()
+                if time.time() - self._last_flush >= self.flush_seconds:
+                    self.flush()
+            except Exception as e:
+                print(f"[popularity] {e}")
+
+    def apply(self) -> int:
+        """Fold the buffered events into the counters."""
+        by_kind: Dict[str, List[Tuple[str, float, float]]] = {}
+        n = 0
+        with self._apply_lock:
+            while True:
+                try:
+                    kind, key, weight, stamp = self._pending.popleft()
+                except IndexError:
+                    break
+                by_kind.setdefault(kind, []).append((key, weight, stamp))
+                n += 1
+            for kind, events in by_kind.items():
+                self.counters[kind].add_many(events)
+            self.applied += n
+        return n
+
+    def counts(self, kind: str, keys: Sequence[str]) -> np.ndarray:
+        return self.counters[kind].counts(keys)
+
+    def generation(self, kind: str) -> int:
+        return self.counters[kind].generation
+
+    # -------- persistence --------
+
+    def flush(self) -> None:
+        self.apply()
+        self._last_flush = time.time()
+        if not self.path or self.applied == self._flushed_applied:
+            return                                      # nothing new since the last write
+        self._flushed_applied = self.applied
+        arrays: Dict[str, np.ndarray] = {}
+        for kind, counter in self.counters.items():
+            for name, value in counter.state().items():
+                arrays[f"{kind}_{name}"] = value
+        with self._flush_lock:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            tmp = f"{self.path}.tmp.npz"
+            np.savez(tmp, **arrays)
+            os.replace(tmp, self.path)
+        self.flushes += 1
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as saved:
+                for kind, counter in self.counters.items():
+                    if f"{kind}_keys" in saved:
+                        counter.restore(saved[f"{kind}_keys"], saved[f"{kind}_values"], saved[f"{kind}_landmark"])
+        except Exception as e:
+            print(f"[popularity] ignoring unreadable log {self.path}: {e}")
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        return {
+            "recorded": self.recorded,
+            "applied": self.applied,
+            "pending": len(self._pending),
+            "flushes": self.flushes,
+            "keys": {kind: len(counter) for kind, counter in self.counters.items()},
+            "top": {kind: counter.top(top) for kind, counter in self.counters.items()},
+        }
+
+
+popularity = PopularityLog(
+    half_life_days=float(os.getenv("POPULARITY_HALF_LIFE_DAYS", "7")),
+    apply_seconds=float(os.getenv("POPULARITY_APPLY_SECONDS", "1")),
+    flush_seconds=float(os.getenv("POPULARITY_FLUSH_SECONDS", "60")),
+)
+atexit.register(popularity.flush)
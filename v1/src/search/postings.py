@@ -0,0 +1,125 @@
+"""
+Inverted-postings scoring for the sparse retrieval channels.
+
+A ``PostingsIndex`` keeps a term × doc weight matrix in column-major (CSC)
+form, i.e. one posting list of (doc, weight) per term.  Scoring a batch of
+queries gathers only the postings of the query terms, sums them per
+(query, doc) and keeps the top k with a partial selection, so the cost
+scales with the number of matching postings rather than with corpus size.
+"""
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def grouped_top_k(
+    rows: np.ndarray,
+    docs: np.ndarray,
+    scores: np.ndarray,
+    n_rows: int,
+    k: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum ``scores`` per (row, doc) pair and keep the best ``k`` docs per row.
+
+    Work is proportional to the number of triples, not to the number of
+    documents.  Returns (ids, scores) arrays of shape (n_rows × k), best
+    first, padded with id -1 / score 0 where a row has fewer than k docs.
+    """
+    out_ids = np.full((n_rows, k), -1, dtype=np.int64)
+    out_scores = np.zeros((n_rows, k), dtype=np.float64)
+    if len(docs) == 0 or k <= 0:
+        return out_ids, out_scores
+
+    rows = np.asarray(rows, dtype=np.int64)
+    docs = np.asarray(docs, dtype=np.int64)
+    n_docs = int(docs.max()) + 1
+    keys, inverse = np.unique(rows * n_docs + docs, return_inverse=True)
+    summed = np.bincount(inverse, weights=scores, minlength=len(keys))
+
+    # keys come back sorted, so each row's candidates are one contiguous run
+    key_row = keys // n_docs
+    bounds = np.searchsorted(key_row, np.arange(n_rows + 1))
+    for row in np.nonzero(np.diff(bounds))[0]:
+        lo, hi = bounds[row], bounds[row + 1]
+        seg = summed[lo:hi]
+        if hi - lo > k:
+            best = np.argpartition(-seg, k - 1)[:k]
+        else:
+            best = np.arange(hi - lo)
+        best = best[np.argsort(-seg[best], kind="stable")]
+        out_ids[row, : len(best)] = keys[lo + best] % n_docs
+        out_scores[row, : len(best)] = seg[best]
+    return out_ids, out_scores
+
+
+class PostingsIndex:
+    """Term-major posting lists: postings of term t are ``indptr[t]:indptr[t+1]``."""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def from_doc_term(cls, matrix: sp.spmatrix) -> "PostingsIndex":
+        """Build from a doc × term matrix (e.g. the CSR sparse embeddings)."""
+        csc = sp.csc_matrix(matrix)
+        csc.sort_indices()
+        return cls(csc.indptr.astype(np.int64), csc.indices.astype(np.int32), csc.data.astype(np.float32))
+
+    @property
+    def n_terms(self) -> int:
+        return len(self.indptr) - 1
+
+    def gather(
+        self, query_rows: np.ndarray, terms: np.ndarray, weights: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """All postings of the given (query row, term, weight) triples as flat arrays."""
+        keep = (terms >= 0) & (terms < self.n_terms)
+        query_rows, terms, weights = query_rows[keep], terms[keep], weights[keep]
+        starts = np.asarray(self.indptr[terms], dtype=np.int64)
+        lengths = np.asarray(self.indptr[terms + 1], dtype=np.int64) - starts
+        total = int(lengths.sum())
+        # offset of every posting = start of its list + position within it
+        run_start = np.cumsum(lengths) - lengths
+        offsets = np.repeat(starts - run_start, lengths) + np.arange(total)
+        return (
+            np.repeat(query_rows, lengths),
+            np.asarray(self.indices[offsets], dtype=np.int64),
+            np.asarray(self.data[offsets], dtype=np.float64) * np.repeat(weights, lengths),
+        )
+
+    def search_many(
+        self,
+        queries: sp.spmatrix,
+        k: int,
+        doc_map: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score an (n_queries × n_terms) query matrix against the postings.
+
+        ``doc_map`` optionally maps posting ids to output doc ids (-1 drops
+        the posting), e.g. passages to courses; mapped scores are summed.
+        Returns (ids, scores) of shape (n_queries × k), best first, -1 padded.
+        """
+        q = sp.csr_matrix(queries)
+        query_rows = np.repeat(np.arange(q.shape[0]), np.diff(q.indptr))
+        rows, docs, scores = self.gather(
+            query_rows, q.indices.astype(np.int64), q.data.astype(np.float64)
+        )
+        if doc_map is not None:
+            docs = doc_map[docs]
+            mask = docs >= 0
+            rows, docs, scores = rows[mask], docs[mask], scores[mask]
+        return grouped_top_k(rows, docs, scores, q.shape[0], k)
+
+
+def term_query_matrix(term_lists: Sequence[Sequence[int]], n_terms: int) -> sp.csr_matrix:
+    """Unit-weight query matrix from per-query lists of term ids."""
+    indptr = np.concatenate([[0], np.cumsum([len(t) for t in term_lists])])
+    indices = np.fromiter((t for terms in term_lists for t in terms), dtype=np.int64, count=int(indptr[-1]))
+    return sp.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, indptr), shape=(len(term_lists), n_terms)
+    )
@@ -1,61 +1,230 @@
-class TrieNode:
-    def __init__(self):
-        self.children = {}
-        self.last = False
-
-class Trie:
-    def __init__(self):
-        self.root = TrieNode()
-        print("Trie initialized with empty root")  # Debug print
-
-    def formTrie(self, keys):
-        """Initialize the trie with a list of keys."""
-        print(f"Forming trie with {len(keys)} keys")  # Debug print
-        for key in keys:
-            self.insert(key)
-        print("Trie formation complete")  # Debug print
-    
-    def insert(self, key):
-        """Insert a key into the trie."""
-        cur = self.root
-        for char in key:
-            if not cur.children.get(char):
-                cur.children[char] = TrieNode()
-            cur = cur.children[char]
-        cur.last = True
-    
-    def suggestionsRec(self, node, word, words):
-        """Recursively traverse the trie and collect words."""
-        if node.last:
-            words.append(word)
-
-        for a, n in node.children.items():
-            self.suggestionsRec(n, word + a, words)
-
-    def autocomplete(self, prefix):
-        """
-        Return a list of words that start with the given prefix.
-        
-        Args:
-            prefix (str): The prefix to search for
-            
-        Returns:
-            List[str]: List of matching words
-        """
-        print(f"Searching for prefix: {prefix}")  # Debug print
-        node = self.root
-        for ch in prefix:
-            if ch not in node.children:
-                print(f"Character '{ch}' not found in children")  # Debug print
-                return []
-            node = node.children[ch]
-
-        results = []
-        self.suggestionsRec(node, prefix, results)
-        print(f"Found {len(results)} matches")  # Debug print
-        return results
-
-
-
-    
+"""
+Compact prefix index for autocomplete.
 
+Keys are stored as a sorted string table: one UTF-8 blob plus an offsets
+array, so the keys starting with a prefix are one contiguous range.  The
+first 8 bytes of every key are also packed into a sorted uint64 array, so
+the range of any prefix up to 8 bytes is two ``np.searchsorted`` calls;
+longer prefixes bisect the keys inside that range.  Completions are ranked
+by a precomputed global rank (score, higher first, then alphabetically);
+the top k of a range are its k smallest ranks.  Prefixes matching more
+than ``hot_range`` keys ("c", "intro") get their top k precomputed at build
+time, so every lookup costs O(log n + k) or a partial selection over at
+most ``hot_range`` ranks.
+
+Everything lives in flat numpy arrays written with ``save`` and mapped by
+``load``; workers share the pages and start without rebuilding anything.
+
+    directory/
+        keys.npy / key_offsets.npy          sorted lowercase keys (uint8 blob)
+        key_heads.npy                       uint64 big-endian first 8 bytes of each key
+        display.npy / display_offsets.npy   text returned for each key
+        rank.npy                            int32 global rank of each key
+        score.npy                           float32 build-time score of each key
+        hot_top.npy                         int32 (n_hot × top_k) key ids, -1 padded
+        manifest.json                       version, sizes, hot prefixes
+"""
+import json
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from v1.src.search.index_store import _save_json, _save_npy
+
+MANIFEST_FILE = "manifest.json"
+# bumped whenever the set of saved arrays changes, so old directories get rebuilt
+TRIE_FORMAT = 2
+HEAD_BYTES = 8
+
+
+def _blob(strings: Sequence[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in strings])
+    return np.frombuffer(b"".join(strings), dtype=np.uint8), offsets
+
+
+def _head(prefix: bytes, pad: bytes = b"\0") -> np.uint64:
+    return np.uint64(int.from_bytes(prefix[:HEAD_BYTES].ljust(HEAD_BYTES, pad), "big"))
+
+
+class _Keys:
+    """Random access to the i-th key of the blob, as bytes (for bisect)."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        # plain ndarray views of the maps: indexing np.memmap is several times slower
+        self.blob = np.asarray(blob)
+        self.offsets = np.asarray(offsets)
+        self._view = memoryview(self.blob)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self._view[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes()
+
+
+class CompactTrie:
+    def __init__(
+        self,
+        keys: np.ndarray,
+        key_offsets: np.ndarray,
+        display: np.ndarray,
+        display_offsets: np.ndarray,
+        key_heads: np.ndarray,
+        rank: np.ndarray,
+        score: np.ndarray,
+        hot_prefixes: Sequence[str],
+        hot_top: np.ndarray,
+        top_k: int = 10,
+        hot_range: int = 64,
+    ):
+        self._keys = _Keys(keys, key_offsets)
+        self._display = _Keys(display, display_offsets)
+        self.key_heads = np.asarray(key_heads)
+        self.rank = np.asarray(rank)
+        self.score = np.asarray(score)
+        self.hot_top = np.asarray(hot_top)
+        self.hot: Dict[str, int] = {prefix: row for row, prefix in enumerate(hot_prefixes)}
+        self.top_k = top_k
+        self.hot_range = hot_range
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # -------- build / persist --------
+
+    @classmethod
+    def build(
+        cls, entries: Dict[str, Tuple[str, float]], top_k: int = 10, hot_range: int = 64
+    ) -> "CompactTrie":
+        """`entries` maps lowercase key -> (display text, score)."""
+        keys = sorted(entries, key=lambda key: key.encode("utf-8"))
+        order = sorted(range(len(keys)), key=lambda i: (-entries[keys[i]][1], keys[i]))
+        rank = np.empty(len(keys), dtype=np.int32)
+        rank[order] = np.arange(len(keys), dtype=np.int32)
+
+        encoded = [k.encode("utf-8") for k in keys]
+        key_blob, key_offsets = _blob(encoded)
+        key_heads = np.array([_head(k) for k in encoded], dtype=np.uint64)
+        display_blob, display_offsets = _blob([entries[k][0].encode("utf-8") for k in keys])
+        score = np.array([entries[k][1] for k in keys], dtype=np.float32)
+        trie = cls(key_blob, key_offsets, display_blob, display_offsets, key_heads, rank, score,
+                   [], np.zeros((0, top_k), dtype=np.int32), top_k, hot_range)
+
+        # walk down every prefix whose range is still too big to rank on the fly
+        hot_prefixes: List[str] = []
+        hot_rows: List[np.ndarray] = []
+        pending = [""]
+        while pending:
+            prefix = pending.pop()
+            lo, hi = trie.prefix_range(prefix)
+            if hi - lo <= hot_range:
+                continue
+            if prefix:
+                hot_prefixes.append(prefix)
+                row = np.full(top_k, -1, dtype=np.int32)
+                best = trie._rank_range(lo, hi, top_k)
+                row[: len(best)] = best
+                hot_rows.append(row)
+            pending.extend({keys[i][: len(prefix) + 1] for i in range(lo, hi) if len(keys[i]) > len(prefix)})
+        trie.hot = {prefix: row for row, prefix in enumerate(hot_prefixes)}
+        trie.hot_top = np.vstack(hot_rows) if hot_rows else trie.hot_top
+        return trie
+
+    def save(self, directory: Path, version: str) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "keys.npy": self._keys.blob,
+            "key_offsets.npy": self._keys.offsets,
+            "display.npy": self._display.blob,
+            "display_offsets.npy": self._display.offsets,
+            "key_heads.npy": self.key_heads,
+            "rank.npy": self.rank,
+            "score.npy": self.score,
+            "hot_top.npy": self.hot_top,
+        }
+        for name, arr in arrays.items():
+            _save_npy(directory / name, np.asarray(arr))
+        manifest = {
+            "format": TRIE_FORMAT,
+            "version": version,
+            "n_keys": len(self),
+            "top_k": self.top_k,
+            "hot_range": self.hot_range,
+            "hot_prefixes": sorted(self.hot, key=self.hot.get),
+        }
+        _save_json(directory / MANIFEST_FILE, manifest)     # last, like index_store
+
+    @staticmethod
+    def saved_version(directory: Path) -> Optional[str]:
+        try:
+            with open(Path(directory) / MANIFEST_FILE, encoding="utf-8") as f:
+                manifest = json.load(f)
+            return manifest["version"] if manifest.get("format") == TRIE_FORMAT else None
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @classmethod
+    def load(cls, directory: Path) -> "CompactTrie":
+        directory = Path(directory)
+        with open(directory / MANIFEST_FILE, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        def mapped(name: str) -> np.ndarray:
+            return np.load(directory / name, mmap_mode="r")
+
+        return cls(
+            mapped("keys.npy"), mapped("key_offsets.npy"),
+            mapped("display.npy"), mapped("display_offsets.npy"),
+            mapped("key_heads.npy"), mapped("rank.npy"), mapped("score.npy"), manifest["hot_prefixes"], mapped("hot_top.npy"),
+            manifest["top_k"], manifest["hot_range"],
+        )
+
+    # -------- lookup --------
+
+    def key(self, i: int) -> str:
+        return self._keys[i].decode("utf-8")
+
+    def display(self, i: int) -> str:
+        return self._display[i].decode("utf-8")
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """[lo, hi) of the keys starting with `prefix`."""
+        p = prefix.encode("utf-8")
+        # keys starting with p[:8] have heads between p[:8] padded with 0x00 and with 0xff
+        lo = int(np.searchsorted(self.key_heads, _head(p), "left"))
+        hi = int(np.searchsorted(self.key_heads, _head(p, b"\xff"), "right"))
+        if len(p) > HEAD_BYTES:
+            # 0xff never occurs in UTF-8, so p + 0xff sorts after every key extending p
+            lo = bisect_left(self._keys, p, lo, hi)
+            hi = bisect_left(self._keys, p + b"\xff", lo, hi)
+        return lo, hi
+
+    def _rank_range(self, lo: int, hi: int, k: int) -> np.ndarray:
+        ranks = np.asarray(self.rank[lo:hi])
+        if len(ranks) > k:
+            part = np.argpartition(ranks, k - 1)[:k]
+        else:
+            part = np.arange(len(ranks))
+        return lo + part[np.argsort(ranks[part])]
+
+    def complete(self, prefix: str, k: Optional[int] = None) -> List[int]:
+        """Ids of the best-ranked keys starting with `prefix`."""
+        k = self.top_k if k is None else min(k, self.top_k)
+        row = self.hot.get(prefix)
+        if row is not None:
+            ids = np.asarray(self.hot_top[row, :k])
+            return ids[ids >= 0].tolist()
+        lo, hi = self.prefix_range(prefix)
+        return self._rank_range(lo, hi, k).tolist() if hi > lo else []
+
+    def autocomplete(self, prefix: str, k: Optional[int] = None) -> List[str]:
+        """Display text of up to `k` (at most `top_k`) best completions of `prefix`."""
+        return [self.display(i) for i in self.complete(prefix, k)]
+
+    def __contains__(self, key: str) -> bool:
+        lo, _ = self.prefix_range(key)
+        return lo < len(self) and self._keys[lo] == key.encode("utf-8")